@@ -0,0 +1,131 @@
+from datetime import date, timedelta
+
+from sqlalchemy import select, func, case, literal, union_all, desc
+
+from app import rollups
+from app.models import Project, ProjectSummary, Task, Milestone, TimeEntry
+
+PROJECT_STATUSES = ["planning", "active", "on_hold", "completed", "archived"]
+TASK_STATUSES = ["todo", "in_progress", "review", "done", "blocked"]
+ACTIVE_TASK_STATUSES = ["todo", "in_progress", "review", "blocked"]
+
+# How many tasks per status the dashboard lists; the rest are counted, not loaded
+DASHBOARD_TASKS_PER_STATUS = 5
+
+
+async def dashboard_counts(db, user_id: str, today: date) -> dict:
+    # Project status counts, task status + overdue counts (summed from the
+    # per-project summaries, see app/rollups.py) and this week's hours in a
+    # single statement
+    start_of_week = today - timedelta(days=today.weekday())
+    summary = ProjectSummary
+
+    parts = [
+        select(
+            literal("project").label("kind"), Project.status.label("status"),
+            func.count(Project.id).label("n"), literal(0.0).label("hours")
+        ).where(Project.user_id == user_id).group_by(Project.status),
+        # Projects whose summary is missing or from an earlier day
+        select(literal("stale"), literal(None), func.count(Project.id), literal(0.0))
+        .outerjoin(summary, summary.project_id == Project.id)
+        .where(Project.user_id == user_id, (summary.as_of == None) | (summary.as_of != today)),
+        select(literal("overdue"), literal(None), func.coalesce(func.sum(summary.overdue_tasks), 0), literal(0.0))
+        .where(summary.user_id == user_id),
+        select(literal("hours"), literal(None), literal(0), func.coalesce(func.sum(TimeEntry.hours), 0.0))
+        .where(TimeEntry.user_id == user_id, TimeEntry.date >= start_of_week),
+    ]
+    for status in TASK_STATUSES:
+        parts.append(
+            select(literal("task"), literal(status), func.coalesce(func.sum(getattr(summary, f"tasks_{status}")), 0), literal(0.0))
+            .where(summary.user_id == user_id)
+        )
+
+    counts = {
+        "projects": {s: 0 for s in PROJECT_STATUSES},
+        "tasks": {s: 0 for s in TASK_STATUSES},
+        "total_projects": 0,
+        "active_tasks": 0,
+        "overdue_items": 0,
+        "hours_logged": 0.0,
+    }
+    stale = False
+    for kind, status, n, hours_sum in (await db.execute(union_all(*parts))).all():
+        if kind == "stale":
+            stale = bool(n)
+        elif kind == "project":
+            counts["total_projects"] += n
+            if status in counts["projects"]:
+                counts["projects"][status] = n
+        elif kind == "task":
+            counts["tasks"][status] = n
+        elif kind == "overdue":
+            counts["overdue_items"] = n
+        else:
+            counts["hours_logged"] = hours_sum
+
+    if stale:
+        # Sum the task counts from the refreshed summaries themselves: re-reading
+        # them could still see the old rows (a replica that has not caught up)
+        summaries = [s for s in (await rollups.refresh_tenant(db, user_id, today)).values() if s is not None]
+        for status in TASK_STATUSES:
+            counts["tasks"][status] = sum(getattr(s, f"tasks_{status}") for s in summaries)
+        counts["overdue_items"] = sum(s.overdue_tasks for s in summaries)
+    counts["active_tasks"] = sum(counts["tasks"][s] for s in ACTIVE_TASK_STATUSES)
+    return counts
+
+
+async def upcoming_deadlines(db, user_id: str, today: date, days: int = 7) -> list:
+    # Open tasks and milestones due in the next `days` days, merged and sorted in SQL
+    until = today + timedelta(days=days)
+    tasks = select(
+        literal("Task").label("type"), Task.id, Task.title, Task.due_date, Task.project_id
+    ).join(Project, Project.id == Task.project_id).where(
+        Project.user_id == user_id,
+        Task.due_date >= today,
+        Task.due_date <= until,
+        Task.status != "done"
+    )
+    milestones = select(
+        literal("Milestone"), Milestone.id, Milestone.title, Milestone.due_date, Milestone.project_id
+    ).join(Project, Project.id == Milestone.project_id).where(
+        Project.user_id == user_id,
+        Milestone.due_date >= today,
+        Milestone.due_date <= until,
+        Milestone.completed == False
+    )
+    upcoming = union_all(tasks, milestones).subquery()
+    rows = (await db.execute(select(upcoming).order_by(upcoming.c.due_date))).mappings().all()
+    return [dict(row) for row in rows]
+
+
+async def dashboard_tasks(db, user_id: str, per_status: int = DASHBOARD_TASKS_PER_STATUS) -> dict:
+    # First few tasks of each status (soonest due first), only the columns the template shows
+    ranked = select(
+        Task.id, Task.title, Task.status, Task.priority, Task.project_id, Task.due_date,
+        func.row_number().over(
+            partition_by=Task.status,
+            order_by=(Task.due_date.is_(None), Task.due_date, Task.id)
+        ).label("rn")
+    ).join(Project, Project.id == Task.project_id).where(Project.user_id == user_id).subquery()
+
+    tasks_by_status = {s: [] for s in TASK_STATUSES}
+    rows = (await db.execute(select(ranked).where(ranked.c.rn <= per_status).order_by(ranked.c.rn))).all()
+    for row in rows:
+        if row.status in tasks_by_status:
+            tasks_by_status[row.status].append(row)
+    return tasks_by_status
+
+
+async def recent_activity(db, user_id: str, limit: int = 10) -> list:
+    return (await db.execute(
+        select(TimeEntry.id, TimeEntry.hours, TimeEntry.description, TimeEntry.date)
+        .where(TimeEntry.user_id == user_id)
+        .order_by(desc(TimeEntry.created_at))
+        .limit(limit)
+    )).all()
+
+
+def progress_percent(total_tasks, done_tasks) -> int:
+    if not total_tasks:
+        return 0
+    return int((done_tasks / total_tasks) * 100)
@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import sys
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles
+
+from app.compression import negotiate
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Fingerprinted, precompressed static assets (/static).
+#
+# Templates link assets through asset_url("style.css"), which returns
+# /static/style.<content hash>.css. That URL never changes meaning, so
+# StaticAssets serves it with a one-year immutable Cache-Control: browsers
+# don't even revalidate, and a deploy that changes the file changes the URL.
+# The hashes are computed from the files when this module is imported (a few
+# KiB), so they always match what is served.
+#
+# `python -m app.assets`, run when the image is built, writes style.css.br and
+# style.css.gz next to each asset at the highest levels. StaticAssets serves
+# the one the client accepts with Content-Encoding set. A variant older than
+# its source (edited locally without rebuilding) is ignored.
+#
+# Unfingerprinted URLs are served as plain StaticFiles; an old deploy's hash
+# gets the current file without the immutable header.
+STATIC_DIR = "app/static"
+STATIC_URL = "/static/"
+IMMUTABLE = "public, max-age=31536000, immutable"
+VARIANTS = {"br": ".br", "gzip": ".gz"}
+
+_FINGERPRINT = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{12})(?P<ext>\.[^./]+)$")
+
+
+def _is_variant(name: str) -> bool:
+    return name.endswith(tuple(VARIANTS.values()))
+
+
+def _sources():
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs.sort()
+        for name in sorted(files):
+            if not _is_variant(name):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, STATIC_DIR).replace(os.sep, "/"), path
+
+
+def _fingerprints() -> dict:
+    hashes = {}
+    for name, path in _sources():
+        with open(path, "rb") as f:
+            hashes[name] = hashlib.sha256(f.read()).hexdigest()[:12]
+    return hashes
+
+_hashes = _fingerprints()
+
+
+def asset_url(name: str) -> str:
+    digest = _hashes.get(name)
+    if digest is None:
+        return STATIC_URL + name
+    stem, ext = os.path.splitext(name)
+    return f"{STATIC_URL}{stem}.{digest}{ext}"
+
+
+class StaticAssets(StaticFiles):
+    def __init__(self, directory: str = STATIC_DIR, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+
+    async def get_response(self, path: str, scope):
+        match = _FINGERPRINT.match(path.replace(os.sep, "/"))
+        name = match and match["stem"] + match["ext"]
+        if not match or name not in _hashes or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+        if match["hash"] != _hashes[name]:
+            return await super().get_response(name, scope)
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), tuple(VARIANTS))
+        full_path, stat_result, encoding = await anyio.to_thread.run_sync(self._lookup_variant, name, encoding)
+        if stat_result is None:
+            return await super().get_response(name, scope)
+
+        response = FileResponse(full_path, stat_result=stat_result,
+                                media_type=mimetypes.guess_type(name)[0] or "application/octet-stream")
+        response.headers["Cache-Control"] = IMMUTABLE
+        response.headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+    def _lookup_variant(self, name: str, encoding: str):
+        full_path, source = self.lookup_path(name)
+        if source is None or not stat.S_ISREG(source.st_mode):
+            return "", None, None
+        if encoding:
+            variant_path, variant = self.lookup_path(name + VARIANTS[encoding])
+            if variant is not None and variant.st_mtime >= source.st_mtime:
+                return variant_path, variant, encoding
+        return full_path, source, None
+
+
+def build(verbose: bool = True):
+    # Write the .gz / .br variant of every asset
+    for name, path in _sources():
+        with open(path, "rb") as f:
+            data = f.read()
+        written = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            written["br"] = brotli.compress(data, quality=11)
+        for encoding, compressed in written.items():
+            with open(path + VARIANTS[encoding], "wb") as f:
+                f.write(compressed)
+        if verbose:
+            sizes = ", ".join(f"{encoding} {len(c)}" for encoding, c in written.items())
+            print(f"{asset_url(name)}: {len(data)} bytes -> {sizes}")
+    if brotli is None:
+        print("brotli is not installed: wrote gzip variants only", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    build()
@@ -0,0 +1,135 @@
+import functools
+import inspect
+import os
+import time
+
+from app import metrics
+
+# Auth / subscription resolution for protected routes.
+#
+# - The user is resolved once per request: require_active_subscription depends
+#   on the same get_current_user placeholder the routes use, so FastAPI's
+#   per-request dependency cache shares one require_auth call between them.
+# - Subscription status is cached per user for SUBSCRIPTION_TTL_SECONDS and
+#   dropped whenever a billing webhook is processed by this worker (other
+#   workers pick the change up when their entry expires).
+# - Time spent in both is recorded per request through app/metrics.py (so it
+#   shows up in the Server-Timing header and /metrics) and summed in stats().
+SUBSCRIPTION_TTL_SECONDS = int(os.environ.get("SUBSCRIPTION_TTL_SECONDS", "60"))
+SUBSCRIPTION_MAX_ENTRIES = 10000
+
+_subscriptions = {}  # user_id -> (expires_at, subscription)
+_stats = {
+    "requests": 0,
+    "request_ms": 0.0,
+    "auth_ms": 0.0,
+    "subscription_ms": 0.0,
+    "subscription_hits": 0,
+    "subscription_misses": 0,
+    "subscription_invalidations": 0,
+}
+
+
+def _record(name: str, started: float):
+    metrics.record(name, (time.perf_counter() - started) * 1000)
+
+
+def timed_auth(require_auth):
+    # Wrap viv-auth's dependency without changing its signature, so FastAPI
+    # still injects whatever require_auth asks for
+    if inspect.iscoroutinefunction(require_auth):
+        @functools.wraps(require_auth)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await require_auth(*args, **kwargs)
+            finally:
+                _record("auth", started)
+    else:
+        @functools.wraps(require_auth)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return require_auth(*args, **kwargs)
+            finally:
+                _record("auth", started)
+    return wrapper
+
+
+async def cached_subscription(request, user_id, require_subscription):
+    now = time.monotonic()
+    item = _subscriptions.get(user_id)
+    if item and item[0] > now:
+        _stats["subscription_hits"] += 1
+        return item[1]
+
+    _stats["subscription_misses"] += 1
+    started = time.perf_counter()
+    try:
+        # Raises (redirect / 402) for users without an active subscription; those are not cached
+        subscription = await require_subscription(request, user_id=user_id)
+    finally:
+        _record("subscription", started)
+
+    if len(_subscriptions) >= SUBSCRIPTION_MAX_ENTRIES:
+        for key in [k for k, (expires_at, _) in _subscriptions.items() if expires_at <= now]:
+            del _subscriptions[key]
+        if len(_subscriptions) >= SUBSCRIPTION_MAX_ENTRIES:
+            _subscriptions.clear()
+    _subscriptions[user_id] = (now + SUBSCRIPTION_TTL_SECONDS, subscription)
+    return subscription
+
+
+def invalidate_subscriptions(user_id=None):
+    # Webhook payloads identify the billing customer, not our user, so a webhook clears everything
+    _stats["subscription_invalidations"] += 1
+    if user_id is None:
+        _subscriptions.clear()
+    else:
+        _subscriptions.pop(user_id, None)
+
+
+def is_billing_webhook(method: str, path: str) -> bool:
+    # viv-pay registers its own webhook route; match it by path
+    return method == "POST" and "webhook" in path
+
+
+class TimingMiddleware:
+    # Plain ASGI, inside metrics.RequestMetricsMiddleware, which owns the
+    # per-request timings. Everything happens on the response start message:
+    # by then the route (and any webhook handler) has run.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000
+                if is_billing_webhook(scope["method"], scope["path"]) and message["status"] < 400:
+                    invalidate_subscriptions()
+
+                timings = (metrics.current() or {}).get("timings", {})
+                if "auth" in timings or "subscription" in timings:
+                    _stats["requests"] += 1
+                    _stats["request_ms"] += total_ms
+                    _stats["auth_ms"] += timings.get("auth", 0.0)
+                    _stats["subscription_ms"] += timings.get("subscription", 0.0)
+            await send(message)
+
+        await self.app(scope, receive, send_timed)
+
+
+def stats() -> dict:
+    requests = _stats["requests"] or 1
+    overhead_ms = _stats["auth_ms"] + _stats["subscription_ms"]
+    return dict(
+        _stats,
+        avg_auth_ms=round(_stats["auth_ms"] / requests, 2),
+        avg_subscription_ms=round(_stats["subscription_ms"] / requests, 2),
+        auth_share=round(overhead_ms / _stats["request_ms"], 3) if _stats["request_ms"] else 0.0,
+        cached_subscriptions=len(_subscriptions),
+    )
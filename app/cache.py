@@ -0,0 +1,145 @@
+import os
+import pickle
+import time
+from collections import OrderedDict
+
+from sqlalchemy import inspect, select, text
+
+from app.database import async_engine
+from app.models import TenantVersion
+
+try:
+    from redis import asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+# Read-through cache for per-tenant page data (dashboard, project list, project detail).
+#
+# Keys embed a per-tenant generation number; every write path calls
+# invalidate_tenant(), which bumps the generation so all older entries for
+# that tenant become unreachable at once and age out of the LRU / TTL.
+#
+# CACHE_BACKEND=memory (default) keeps entries in this worker only and the
+# generations in the tenant_versions table (one primary-key read per lookup),
+# so a write on one worker is seen by every worker's cache and ETags at once.
+# CACHE_BACKEND=redis with CACHE_URL shares entries and generations between
+# workers.
+TTL_SECONDS = int(os.environ.get("CACHE_TTL_SECONDS", "30"))
+MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "5000"))
+KEY_PREFIX = "viva"
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    async def get(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key, value, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def generation(self, tenant: str) -> int:
+        # Read from the primary: the version must never lag the write that bumped it
+        async with async_engine.connect() as conn:
+            version = await conn.scalar(select(TenantVersion.version).where(TenantVersion.user_id == tenant))
+        return version or 0
+
+    async def bump(self, tenant: str):
+        async with async_engine.begin() as conn:
+            await conn.execute(text(
+                "INSERT INTO tenant_versions (user_id, version) VALUES (:tenant, 1) "
+                "ON CONFLICT (user_id) DO UPDATE SET version = tenant_versions.version + 1"
+            ), {"tenant": tenant})
+
+    async def clear(self):
+        self._entries.clear()
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        if redis_asyncio is None:
+            raise RuntimeError("CACHE_BACKEND=redis needs the redis package installed")
+        self._redis = redis_asyncio.from_url(url)
+
+    async def get(self, key):
+        raw = await self._redis.get(key)
+        return pickle.loads(raw) if raw is not None else None
+
+    async def set(self, key, value, ttl: int):
+        await self._redis.set(key, pickle.dumps(value), ex=ttl)
+
+    async def generation(self, tenant: str) -> int:
+        return int(await self._redis.get(f"{KEY_PREFIX}:gen:{tenant}") or 0)
+
+    async def bump(self, tenant: str):
+        await self._redis.incr(f"{KEY_PREFIX}:gen:{tenant}")
+
+    async def clear(self):
+        async for key in self._redis.scan_iter(f"{KEY_PREFIX}:data:*"):
+            await self._redis.delete(key)
+
+
+def _backend_from_env():
+    if os.environ.get("CACHE_BACKEND", "memory") == "redis":
+        return RedisBackend(os.environ.get("CACHE_URL", "redis://localhost:6379/0"))
+    return MemoryBackend()
+
+_backend = _backend_from_env()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def set_backend(backend):
+    # Any object with async get / set / generation / bump / clear will do
+    global _backend
+    _backend = backend
+
+
+async def cached(tenant: str, name: str, loader, ttl: int = None):
+    # Return the cached value for (tenant, name) or compute it with `await loader()`.
+    # A None result (e.g. not found) is returned but never stored.
+    generation = await _backend.generation(tenant)
+    key = f"{KEY_PREFIX}:data:{tenant}:{generation}:{name}"
+    value = await _backend.get(key)
+    if value is not None:
+        _stats["hits"] += 1
+        return value
+
+    _stats["misses"] += 1
+    value = await loader()
+    if value is not None:
+        await _backend.set(key, value, ttl or TTL_SECONDS)
+    return value
+
+
+async def invalidate_tenant(tenant: str):
+    _stats["invalidations"] += 1
+    await _backend.bump(tenant)
+
+
+async def version(tenant: str) -> str:
+    # Changes with every invalidate_tenant(): the tenant's data version, for
+    # ETags (app/etags.py). The same on every worker, with either backend.
+    return str(await _backend.generation(tenant))
+
+
+def stats() -> dict:
+    return dict(_stats, backend=type(_backend).__name__)
+
+
+def as_dict(instance) -> dict:
+    # Column values of an ORM object: plain data that pickles and that Jinja
+    # reads with the same `obj.attr` syntax as the object itself
+    return {attr.key: getattr(instance, attr.key) for attr in inspect(instance).mapper.column_attrs}
@@ -0,0 +1,130 @@
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Response compression for dynamic pages and APIs.
+#
+# CompressionMiddleware compresses HTML / JSON / CSV / text responses for
+# clients that accept br or gzip, as the body is sent: every chunk of a
+# streaming response is compressed and flushed on its own, so nothing is
+# held back. A body with a Content-Length under COMPRESS_MIN_BYTES is left
+# alone (the framing would cost more than it saves), and so are HEAD
+# requests, 204 / 304s, event streams and anything that already has a
+# Content-Encoding (the precompressed static files of app/assets.py).
+#
+# Dynamic responses use cheap settings (gzip 6, brotli 4): they are compressed
+# once per request, unlike the static assets, which are compressed at build
+# time at the highest levels.
+MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = (
+    "text/html", "text/css", "text/plain", "text/csv",
+    "application/json", "application/javascript", "application/x-ndjson",
+)
+
+# In order of preference
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+_stats = {"compressed": 0, "bytes_in": 0, "bytes_out": 0}
+
+
+def negotiate(accept_encoding: str, available=ENCODINGS):
+    # First of `available` the client accepts (q > 0), or None for identity
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        token, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(token.strip().lower())
+    for encoding in available:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def compressible(status: int, headers) -> bool:
+    if status < 200 or status in (204, 206, 304) or "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return content_type in COMPRESSIBLE_TYPES
+
+
+class _Gzip:
+    def __init__(self):
+        self._z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class _Brotli:
+    def __init__(self):
+        self._b = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        return self._b.process(data) + (self._b.finish() if last else self._b.flush())
+
+
+COMPRESSORS = {"gzip": _Gzip, "br": _Brotli}
+
+
+class CompressionMiddleware:
+    # Plain ASGI like etags.ETagMiddleware. The decision is made on the response
+    # start message: complete bodies carry a Content-Length, and streams (no
+    # Content-Length) are always compressed.
+    def __init__(self, app, minimum_size: int = MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal compressor
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if compressible(message["status"], headers) and int(headers.get("content-length", self.minimum_size)) >= self.minimum_size:
+                    compressor = COMPRESSORS[encoding]()
+                    del headers["content-length"]
+                    headers["Content-Encoding"] = encoding
+                    if "accept-encoding" not in headers.get("vary", "").lower():
+                        headers.add_vary_header("Accept-Encoding")
+                    etag = headers.get("etag")
+                    if etag and not etag.startswith("W/"):
+                        headers["ETag"] = "W/" + etag  # the bytes differ from the identity response
+                    _stats["compressed"] += 1
+                return await send(message)
+            if compressor is None or message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            data = compressor.chunk(body, last=not more)
+            _stats["bytes_in"] += len(body)
+            _stats["bytes_out"] += len(data)
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def stats() -> dict:
+    return dict(_stats, encodings=list(ENCODINGS))
@@ -1,19 +1,133 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import time
+from contextlib import asynccontextmanager
+from http.cookies import SimpleCookie
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from starlette.datastructures import MutableHeaders
+
+from app import metrics
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
 if not DATABASE_URL:
     os.makedirs("/data", exist_ok=True)
     DATABASE_URL = "sqlite:////data/app.db"
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+def to_async_url(url: str) -> str:
+    # Swap the sync driver for its asyncio counterpart (aiosqlite / asyncpg)
+    scheme, sep, rest = url.partition("://")
+    backend = scheme.split("+")[0]
+    if backend == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if backend in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+# Engine profiles (see README "Database configuration"). DB_PROFILE picks one
+# explicitly; by default it follows the DATABASE_URL backend. "library" keeps
+# SQLAlchemy / driver defaults and is only meant for comparisons.
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+BACKEND = DATABASE_URL.split("://")[0].split("+")[0]
+DB_PROFILE = os.environ.get("DB_PROFILE") or ("sqlite" if BACKEND == "sqlite" else "postgres")
+
+POSTGRES_SETTINGS = {
+    "pool_size": _env_int("DB_POOL_SIZE", 10),
+    "max_overflow": _env_int("DB_MAX_OVERFLOW", 10),
+    "pool_timeout": _env_int("DB_POOL_TIMEOUT", 10),
+    "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+    "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "1") == "1",
+}
+STATEMENT_TIMEOUT_MS = _env_int("DB_STATEMENT_TIMEOUT_MS", 15000)
+
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+    "cache_size": -_env_int("SQLITE_CACHE_SIZE_KB", 65536),  # negative = KiB
+    "mmap_size": _env_int("SQLITE_MMAP_SIZE", 268435456),
+    "temp_store": "MEMORY",
+}
+
+def engine_options(is_async: bool = False) -> dict:
+    if DB_PROFILE == "sqlite":
+        options = {
+            "connect_args": {"check_same_thread": False} if not is_async else {},
+            "pool_size": _env_int("DB_POOL_SIZE", 5),
+            "max_overflow": _env_int("DB_MAX_OVERFLOW", 10),
+        }
+        if is_async:
+            # aiosqlite defaults to NullPool, which reconnects (and loses the page cache) per session
+            options["poolclass"] = AsyncAdaptedQueuePool
+        return options
+    if DB_PROFILE == "postgres":
+        if is_async:
+            connect_args = {"server_settings": {"statement_timeout": str(STATEMENT_TIMEOUT_MS)}}
+        else:
+            connect_args = {"options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS}"}
+        return dict(POSTGRES_SETTINGS, connect_args=connect_args)
+    return {"connect_args": {"check_same_thread": False} if BACKEND == "sqlite" and not is_async else {}}
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def configure(sync_engine):
+    # Per-connection setup that can't be expressed as create_engine arguments,
+    # plus statement count / timing hooks for app/metrics.py
+    if DB_PROFILE == "sqlite" and BACKEND == "sqlite":
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+    metrics.instrument_engine(sync_engine)
+    return sync_engine
+
+# Sync engine: still used by viv-auth / viv-pay and for create_all at startup
+engine = configure(create_engine(DATABASE_URL, **engine_options()))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: used by every router in app/routes so queries never block the event loop
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(is_async=True))
+configure(async_engine.sync_engine)
+
+# expire_on_commit=False so attributes stay readable after commit without
+# an implicit (and, under asyncio, illegal) lazy refresh
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Optional read replica. GET / HEAD requests read from it unless the client
+# wrote something in the last REPLICA_STICKY_SECONDS (read-your-writes: the
+# StickyPrimaryMiddleware cookie set after every successful write keeps e.g.
+# the redirect after create_task on the primary while the replica catches up).
+REPLICA_DATABASE_URL = os.environ.get("REPLICA_DATABASE_URL")
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", "10"))
+STICKY_COOKIE = "viva_primary_until"
+READ_METHODS = ("GET", "HEAD")
+
+class ReadOnlySession(Session):
+    # Catches ORM writes on a replica session before the database rejects them
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            raise RuntimeError("Write attempted on a read-replica session; use database.writable(db)")
+        super().flush(objects)
+
+if REPLICA_DATABASE_URL:
+    replica_engine = create_async_engine(to_async_url(REPLICA_DATABASE_URL), **engine_options(is_async=True))
+    configure(replica_engine.sync_engine)
+    ReplicaSessionLocal = async_sessionmaker(
+        bind=replica_engine, class_=AsyncSession, sync_session_class=ReadOnlySession,
+        autoflush=False, expire_on_commit=False
+    )
+else:
+    replica_engine = None
+    ReplicaSessionLocal = None
+
 Base = declarative_base()
 
 def get_db():
@@ -22,3 +136,56 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def reads_from_replica(request: Request) -> bool:
+    if ReplicaSessionLocal is None or request.method not in READ_METHODS:
+        return False
+    try:
+        sticky_until = float(request.cookies.get(STICKY_COOKIE) or 0)
+    except ValueError:
+        sticky_until = 0
+    return sticky_until < time.time()
+
+def session_factory(request: Request):
+    # Replica or primary, as for get_async_db. Streaming responses open their
+    # session with this inside the body generator: FastAPI closes dependency
+    # sessions before the body is sent.
+    return ReplicaSessionLocal if reads_from_replica(request) else AsyncSessionLocal
+
+async def get_async_db(request: Request):
+    async with session_factory(request)() as db:
+        yield db
+
+def is_replica(db) -> bool:
+    return replica_engine is not None and db.bind is replica_engine
+
+@asynccontextmanager
+async def writable(db):
+    # db itself, or a primary session when db reads from the replica. For the
+    # few GET paths that write (first-visit seeding, summary refreshes).
+    if is_replica(db):
+        async with AsyncSessionLocal() as primary:
+            yield primary
+    else:
+        yield db
+
+class StickyPrimaryMiddleware:
+    # Plain ASGI: adds the cookie to the response start message of a successful write
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if ReplicaSessionLocal is None or scope["type"] != "http" or scope["method"] in READ_METHODS:
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = SimpleCookie()
+                cookie[STICKY_COOKIE] = f"{time.time() + REPLICA_STICKY_SECONDS:.3f}"
+                cookie[STICKY_COOKIE].update(
+                    {"max-age": REPLICA_STICKY_SECONDS, "path": "/", "httponly": True, "samesite": "lax"}
+                )
+                MutableHeaders(scope=message).append("set-cookie", cookie.output(header="").strip())
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import time
+from datetime import date
+
+from fastapi import HTTPException
+from starlette.datastructures import MutableHeaders
+
+from app import cache
+from app.database import REPLICA_STICKY_SECONDS, reads_from_replica
+
+# Conditional GET for the tenant's pages and list endpoints.
+#
+# A response's ETag hashes the request path and query string, the tenant,
+# the tenant's data version (cache.version(), bumped by invalidate_tenant() on
+# every write path and shared by all workers), today's date (overdue /
+# upcoming items depend on it) and the deployed code.
+# Routes add
+#     _etag: Any = Depends(check_etag)
+# (app/routes/__init__.py, which runs check() once the user and subscription
+# are resolved). A matching If-None-Match is answered with 304 right there,
+# before any query or template render; otherwise ETagMiddleware puts the ETag on
+# the 200.
+#
+# Replica reads can lag the write that bumped the version, so their ETags also
+# change every REPLICA_STICKY_SECONDS.
+CACHE_CONTROL = "private, no-cache"  # always revalidate, never share between users
+
+_stats = {"checks": 0, "not_modified": 0}
+
+
+def _build_id() -> str:
+    # Code, templates and static assets of this deploy: a release must not
+    # validate old pages (they link the previous asset fingerprints)
+    digest = hashlib.sha1(os.environ.get("APP_BUILD", "").encode())
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    for root, dirs, files in os.walk(app_dir):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for name in sorted(files):
+            if name.endswith((".py", ".html", ".css", ".js")):
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                digest.update(f"{os.path.relpath(path, app_dir)}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return digest.hexdigest()[:12]
+
+BUILD_ID = _build_id()
+
+
+def matches(if_none_match: str, tag: str) -> bool:
+    # Weak comparison, as If-None-Match requires
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or tag in [c[2:] if c.startswith("W/") else c for c in candidates]
+
+
+async def check(request, tenant: str):
+    parts = [
+        request.url.path, request.url.query, tenant, await cache.version(tenant),
+        date.today().isoformat(), BUILD_ID,
+    ]
+    if reads_from_replica(request):
+        parts.append(str(int(time.time() // REPLICA_STICKY_SECONDS)))
+    tag = '"' + hashlib.sha1("|".join(parts).encode()).hexdigest()[:20] + '"'
+
+    _stats["checks"] += 1
+    if matches(request.headers.get("if-none-match"), tag):
+        _stats["not_modified"] += 1
+        raise HTTPException(status_code=304, headers={"ETag": tag, "Cache-Control": CACHE_CONTROL})
+    request.state.etag = tag
+
+
+class ETagMiddleware:
+    # Plain ASGI rather than app.middleware("http"): it only edits the
+    # response start message, without a BaseHTTPMiddleware layer per request
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_etag(message):
+            tag = scope.get("state", {}).get("etag")
+            if message["type"] == "http.response.start" and tag and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                if "etag" not in headers:
+                    headers["ETag"] = tag
+                    headers["Cache-Control"] = CACHE_CONTROL
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+def stats() -> dict:
+    return dict(_stats)
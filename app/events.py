@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from contextlib import asynccontextmanager
+
+from app import metrics
+
+try:
+    from redis import asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+# Live updates for open pages (task board, dashboard) over Server-Sent Events.
+#
+# Write routes call publish(tenant, deltas) after their commit; every GET
+# /events stream of that tenant then receives them as one SSE message,
+# {"id": ..., "deltas": [...]}, the deltas being small dicts built by the
+# helpers below (task_delta, ...). Pages patch themselves from those instead
+# of reloading.
+#
+# EVENTS_BACKEND=memory (default) delivers to streams in this worker only.
+# EVENTS_BACKEND=redis with EVENTS_URL (default CACHE_URL) publishes on one
+# Redis channel per tenant; each worker subscribes to the channels of the
+# tenants it has open streams for and fans messages out locally.
+#
+# A stream that falls QUEUE_SIZE messages behind is sent a single "resync"
+# delta instead of the backlog, and the page reloads.
+#
+# Streams are handed over after MAX_STREAM_SECONDS, so workers can restart
+# and rebalance: the stream sends a "reconnect" event and keeps delivering
+# for HANDOVER_SECONDS while the page opens its next stream (app/static/live.js
+# drops the duplicates by message id).
+QUEUE_SIZE = int(os.environ.get("EVENTS_QUEUE_SIZE", "100"))
+# Comment lines keep idle streams open through proxies with read timeouts
+HEARTBEAT_SECONDS = float(os.environ.get("EVENTS_HEARTBEAT_SECONDS", "25"))
+MAX_STREAM_SECONDS = float(os.environ.get("EVENTS_MAX_STREAM_SECONDS", "300"))
+HANDOVER_SECONDS = 10
+RETRY_MS = 3000
+CHANNEL_PREFIX = "viva:events:"
+RESYNC = json.dumps({"id": "resync", "deltas": [{"type": "resync"}]})
+
+logger = logging.getLogger(__name__)
+
+_streams = {}  # tenant -> set of this worker's stream queues
+_stats = {"published": 0, "delivered": 0, "resyncs": 0}
+
+
+def deliver(tenant: str, message: str):
+    # Hand a published message to this worker's streams for the tenant
+    for queue in _streams.get(tenant, ()):
+        if queue.full():
+            _stats["resyncs"] += 1
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC)
+        else:
+            _stats["delivered"] += 1
+            queue.put_nowait(message)
+
+
+class MemoryBackend:
+    async def publish(self, tenant: str, message: str):
+        deliver(tenant, message)
+
+    async def watch(self, tenant: str):
+        pass
+
+    async def unwatch(self, tenant: str):
+        pass
+
+    async def close(self):
+        pass
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        if redis_asyncio is None:
+            raise RuntimeError("EVENTS_BACKEND=redis needs the redis package installed")
+        self._redis = redis_asyncio.from_url(url)
+        self._pubsub = self._redis.pubsub()
+        self._listener = None
+
+    async def publish(self, tenant: str, message: str):
+        await self._redis.publish(CHANNEL_PREFIX + tenant, message)
+
+    async def watch(self, tenant: str):
+        await self._pubsub.subscribe(CHANNEL_PREFIX + tenant)
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def unwatch(self, tenant: str):
+        await self._pubsub.unsubscribe(CHANNEL_PREFIX + tenant)
+
+    async def _listen(self):
+        while True:
+            try:
+                item = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("live update subscription failed; retrying")
+                await asyncio.sleep(1)
+                continue
+            if item and item["type"] == "message":
+                deliver(item["channel"].decode()[len(CHANNEL_PREFIX):], item["data"].decode())
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        await self._pubsub.close()
+
+
+def _backend_from_env():
+    if os.environ.get("EVENTS_BACKEND", "memory") == "redis":
+        return RedisBackend(os.environ.get("EVENTS_URL") or os.environ.get("CACHE_URL", "redis://localhost:6379/0"))
+    return MemoryBackend()
+
+_backend = _backend_from_env()
+
+
+def set_backend(backend):
+    # Any object with async publish / watch / unwatch / close will do; it must
+    # call deliver() for messages published by any worker (a test stand-in can
+    # simply call it from publish, like MemoryBackend)
+    global _backend
+    _backend = backend
+
+
+async def publish(tenant: str, deltas: list):
+    # Called after commit: a failed push is logged, never turned into a failed write
+    if not deltas:
+        return
+    _stats["published"] += 1
+    try:
+        await _backend.publish(tenant, json.dumps({"id": uuid.uuid4().hex[:16], "deltas": deltas}, default=str))
+    except Exception:
+        logger.exception("could not publish live update for tenant %s", tenant)
+
+
+@asynccontextmanager
+async def subscribe(tenant: str):
+    queue = asyncio.Queue(QUEUE_SIZE)
+    streams = _streams.setdefault(tenant, set())
+    if not streams:
+        await _backend.watch(tenant)
+    streams.add(queue)
+    _count_streams()
+    try:
+        yield queue
+    finally:
+        streams.discard(queue)
+        _count_streams()
+        if not streams:
+            del _streams[tenant]
+            await _backend.unwatch(tenant)
+
+
+def _count_streams():
+    metrics.set_gauge("viva_live_streams", "Open /events streams in this worker",
+                      sum(len(streams) for streams in _streams.values()))
+
+
+async def stream(tenant: str):
+    # SSE body for one open page. Ends after the handover, or earlier when the
+    # client disconnects (the response is cancelled).
+    loop = asyncio.get_running_loop()
+    handover_at, ends_at = loop.time() + MAX_STREAM_SECONDS, None
+    async with subscribe(tenant) as queue:
+        yield f"retry: {RETRY_MS}\n\n"
+        while ends_at is None or loop.time() < ends_at:
+            if ends_at is None and loop.time() >= handover_at:
+                yield "event: reconnect\ndata: {}\n\n"
+                ends_at = loop.time() + HANDOVER_SECONDS
+            timeout = min(HEARTBEAT_SECONDS, max((ends_at or handover_at) - loop.time(), 0.0))
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield f"data: {message}\n\n"
+
+
+async def close():
+    await _backend.close()
+
+
+def stats() -> dict:
+    return dict(_stats, backend=type(_backend).__name__, tenants=len(_streams),
+                streams=sum(len(streams) for streams in _streams.values()))
+
+
+def task_delta(kind: str, task, changed: dict = None) -> dict:
+    # kind: "task.created" / "task.updated"; changed: previous values of the fields that changed
+    delta = {
+        "type": kind,
+        "id": task.id,
+        "project_id": task.project_id,
+        "title": task.title,
+        "status": task.status,
+        "priority": task.priority,
+        "assigned_to": task.assigned_to,
+        "due_date": task.due_date.isoformat() if task.due_date else None,
+    }
+    if changed:
+        delta["changed"] = changed
+    return delta
+
+
+def time_delta(task_id: int, project_id: int, hours: float, logged_on) -> dict:
+    return {"type": "time.logged", "task_id": task_id, "project_id": project_id,
+            "hours": hours, "date": logged_on.isoformat()}
+
+
+def milestone_delta(milestone) -> dict:
+    return {"type": "milestone.completed", "id": milestone.id, "project_id": milestone.project_id}
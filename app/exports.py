@@ -0,0 +1,147 @@
+import asyncio
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+
+from sqlalchemy import select, text
+
+from app.database import BACKEND
+from app.models import Project, Task, TimeEntry
+
+# Streaming CSV / NDJSON exports of tasks and time entries (billing).
+#
+# Rows are read through a streaming result (AsyncSession.stream with
+# yield_per: a server-side cursor on Postgres, fetchmany on SQLite) and
+# encoded BATCH_ROWS at a time, so a worker holds one batch of plain tuples
+# however long the export is. The CSV header is sent before the query runs.
+#
+# The queries are ordered along an index (tasks: ix_tasks_project_id_status,
+# one project at a time; time entries: ix_time_entries_user_id_date), so the
+# database never sorts the whole result before the first row.
+#
+# An export holds a pooled connection for as long as the client keeps reading;
+# at most MAX_CONCURRENT run at once per worker, the rest get a 429.
+BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", "1000"))
+MAX_CONCURRENT = int(os.environ.get("EXPORT_MAX_CONCURRENT", "4"))
+# Postgres only: replaces DB_STATEMENT_TIMEOUT_MS, which a multi-million-row export outlives
+STATEMENT_TIMEOUT_MS = int(os.environ.get("EXPORT_STATEMENT_TIMEOUT_MS", "900000"))
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}  # StreamingResponse adds the charset to text/csv
+
+TASK_COLUMNS = {
+    "id": Task.id,
+    "project_id": Task.project_id,
+    "project_name": Project.name,
+    "title": Task.title,
+    "status": Task.status,
+    "priority": Task.priority,
+    "assigned_to": Task.assigned_to,
+    "due_date": Task.due_date,
+    "estimated_hours": Task.estimated_hours,
+    "actual_hours": Task.actual_hours,
+    "created_at": Task.created_at,
+    "updated_at": Task.updated_at,
+}
+
+TIME_ENTRY_COLUMNS = {
+    "id": TimeEntry.id,
+    "date": TimeEntry.date,
+    "user_id": TimeEntry.user_id,
+    "hours": TimeEntry.hours,
+    "description": TimeEntry.description,
+    "task_id": TimeEntry.task_id,
+    "task_title": Task.title,
+    "project_id": Task.project_id,
+    "project_name": Project.name,
+    "created_at": TimeEntry.created_at,
+}
+
+_slots = asyncio.Semaphore(MAX_CONCURRENT)
+_stats = {"exports": 0, "rows": 0, "busy": 0}
+
+
+def task_queries(user_id: str, filters: list, project_id: int = None):
+    # One SELECT per project, in (status, id) order within it. A single query
+    # ordered across projects would be sorted in full before the first row:
+    # the tenant's projects are looked up in (user_id, status) order.
+    # filters: routes.tasks.task_filters() clauses (tenant scope included).
+    async def queries(db):
+        projects = select(Project.id).where(Project.user_id == user_id).order_by(Project.id)
+        if project_id:
+            projects = projects.where(Project.id == project_id)
+        for pid in (await db.execute(projects)).scalars().all():
+            yield (
+                select(*TASK_COLUMNS.values()).join(Project, Project.id == Task.project_id)
+                .where(*filters, Task.project_id == pid)
+                .order_by(Task.status, Task.id)
+            )
+    return queries
+
+
+def time_entry_queries(user_id: str, project_id: int = None, task_id: int = None,
+                       date_from: date = None, date_to: date = None):
+    clauses = [TimeEntry.user_id == user_id]
+    if project_id:
+        clauses.append(Task.project_id == project_id)
+    if task_id:
+        clauses.append(TimeEntry.task_id == task_id)
+    if date_from:
+        clauses.append(TimeEntry.date >= date_from)
+    if date_to:
+        clauses.append(TimeEntry.date <= date_to)
+    query = (
+        select(*TIME_ENTRY_COLUMNS.values())
+        .join(Task, Task.id == TimeEntry.task_id).join(Project, Project.id == Task.project_id)
+        .where(*clauses)
+        .order_by(TimeEntry.date, TimeEntry.id)
+    )
+
+    async def queries(db):
+        yield query
+    return queries
+
+
+def busy() -> bool:
+    if _slots.locked():
+        _stats["busy"] += 1
+        return True
+    return False
+
+
+def _cell(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_cell(v) for v in row] for row in rows)
+    return buffer.getvalue()
+
+
+def encode_ndjson(names: list, rows) -> str:
+    return "".join(json.dumps(dict(zip(names, map(_cell, row)))) + "\n" for row in rows)
+
+
+async def stream(session_factory, queries, columns: dict, fmt: str):
+    # Response body generator: the rows of every SELECT queries(db) yields.
+    # It opens its own session, as the request's dependency sessions are
+    # closed before the body is sent.
+    names = list(columns)
+    if fmt == "csv":
+        yield encode_csv([names])
+    async with _slots:
+        _stats["exports"] += 1
+        async with session_factory() as db:
+            if BACKEND != "sqlite" and STATEMENT_TIMEOUT_MS:
+                await db.execute(text(f"SET LOCAL statement_timeout = {STATEMENT_TIMEOUT_MS}"))
+            async for query in queries(db):
+                result = await db.stream(query.execution_options(yield_per=BATCH_ROWS))
+                async for rows in result.partitions():
+                    _stats["rows"] += len(rows)
+                    yield encode_csv(rows) if fmt == "csv" else encode_ndjson(names, rows)
+
+
+def stats() -> dict:
+    return dict(_stats, active=MAX_CONCURRENT - _slots._value)
@@ -0,0 +1,61 @@
+import asyncio
+import importlib
+import importlib.util
+import os
+
+from app import metrics
+
+# google.genai takes about half a second to import, so it is loaded on the first
+# insight generation instead of at boot; available() only checks that it is installed.
+genai = None
+
+MODEL = "gemini-2.5-flash"
+
+# At most this many Gemini calls run at once per worker; further callers wait
+# for a slot (the backlog itself is bounded by the job queue, see app/jobs.py)
+MAX_CONCURRENCY = int(os.environ.get("INSIGHT_MAX_CONCURRENCY", "4"))
+TIMEOUT_SECONDS = float(os.environ.get("INSIGHT_TIMEOUT_SECONDS", "60"))
+
+
+def available() -> bool:
+    try:
+        return importlib.util.find_spec("google.genai") is not None
+    except ModuleNotFoundError:
+        return False
+
+
+def load_sdk():
+    global genai
+    if genai is None:
+        genai = importlib.import_module("google.genai")
+    return genai
+
+
+_client = None
+_client_key = None
+_semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+
+def get_client(api_key: str):
+    # One long-lived client per worker so its HTTP connection pool is reused
+    global _client, _client_key
+    if _client is None or _client_key != api_key:
+        _client = load_sdk().Client(api_key=api_key)
+        _client_key = api_key
+    return _client
+
+
+async def generate(api_key: str, prompt: str) -> str:
+    async with _semaphore:
+        if genai is None:
+            # First use in this worker: import off the event loop
+            await asyncio.to_thread(load_sdk)
+        client = get_client(api_key)
+        # Recorded as the "gemini" phase (route="background" when run by an insight job)
+        with metrics.timer("gemini"):
+            response = await asyncio.wait_for(
+                client.aio.models.generate_content(model=MODEL, contents=prompt),
+                timeout=TIMEOUT_SECONDS
+            )
+        return response.text
+
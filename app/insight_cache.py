@@ -0,0 +1,52 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, desc
+
+from app.models import ProjectInsight
+
+# A stored insight is served again while its prompt inputs are unchanged and it is younger than this
+TTL_SECONDS = int(os.environ.get("INSIGHT_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+_stats = {"hits": 0, "misses": 0, "generations": 0, "generation_seconds": 0.0}
+
+
+def fingerprint(context: dict) -> str:
+    payload = json.dumps(context, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def lookup(db, project_id: int, fp: str):
+    fresh_after = datetime.now(timezone.utc) - timedelta(seconds=TTL_SECONDS)
+    insight = (await db.execute(
+        select(ProjectInsight).where(
+            ProjectInsight.project_id == project_id,
+            ProjectInsight.fingerprint == fp,
+            ProjectInsight.generated_at >= fresh_after
+        ).order_by(desc(ProjectInsight.generated_at)).limit(1)
+    )).scalars().first()
+
+    _stats["hits" if insight else "misses"] += 1
+    return insight
+
+
+def record_generation(seconds: float):
+    _stats["generations"] += 1
+    _stats["generation_seconds"] += seconds
+
+
+def stats() -> dict:
+    # Per-worker counters; each hit is one Gemini call (and its latency) not paid
+    lookups = _stats["hits"] + _stats["misses"]
+    avg_generation = _stats["generation_seconds"] / _stats["generations"] if _stats["generations"] else None
+    return {
+        "hits": _stats["hits"],
+        "misses": _stats["misses"],
+        "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else None,
+        "ttl_seconds": TTL_SECONDS,
+        "llm_calls_saved": _stats["hits"],
+        "avg_generation_seconds": round(avg_generation, 3) if avg_generation is not None else None,
+        "estimated_seconds_saved": round(avg_generation * _stats["hits"], 3) if avg_generation is not None else None,
+    }
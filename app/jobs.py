@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import select, update, func, case
+
+from app import cache, gemini, insight_cache
+from app.database import AsyncSessionLocal
+from app.models import Project, Task, Milestone, ProjectInsight, InsightJob
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.environ.get("INSIGHT_WORKERS", "2"))
+MAX_ATTEMPTS = int(os.environ.get("INSIGHT_MAX_ATTEMPTS", "3"))
+BACKOFF_SECONDS = float(os.environ.get("INSIGHT_BACKOFF_SECONDS", "2"))
+# Per-user limit on new jobs: RATE_LIMIT jobs per RATE_WINDOW_SECONDS
+RATE_LIMIT = int(os.environ.get("INSIGHT_RATE_LIMIT", "10"))
+RATE_WINDOW_SECONDS = int(os.environ.get("INSIGHT_RATE_WINDOW_SECONDS", "60"))
+# New jobs are refused (429) while this many are waiting for a worker in this process
+MAX_PENDING = int(os.environ.get("INSIGHT_MAX_PENDING", "16"))
+# Jobs left "running" longer than this by a crashed worker are re-queued at startup
+STALE_SECONDS = int(os.environ.get("INSIGHT_STALE_SECONDS", "600"))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class RateLimited(Exception):
+    pass
+
+
+class QueueFull(Exception):
+    pass
+
+
+# Generation backends: async callables taking a prompt and returning the insight text.
+# INSIGHT_BACKEND=stub swaps Gemini for a local canned response (tests, dev, load runs).
+async def gemini_backend(prompt: str) -> str:
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise RuntimeError("GOOGLE_API_KEY not set")
+    if not gemini.available():
+        raise RuntimeError("google-genai library not installed")
+    return await gemini.generate(api_key, prompt)
+
+async def stub_backend(prompt: str) -> str:
+    return "Stub insight generated locally. " + " ".join(prompt.split())[:200]
+
+BACKENDS = {
+    "gemini": (gemini_backend, gemini.MODEL),
+    "stub": (stub_backend, "stub"),
+}
+
+_backend, _model_used = BACKENDS[os.environ.get("INSIGHT_BACKEND", "gemini")]
+
+def set_backend(backend, model_used: str):
+    global _backend, _model_used
+    _backend, _model_used = backend, model_used
+
+def backend_error():
+    # Configuration problems worth reporting at enqueue time instead of as a failed job
+    if _backend is gemini_backend:
+        if not os.environ.get("GOOGLE_API_KEY"):
+            return "GOOGLE_API_KEY not set"
+        if not gemini.available():
+            return "google-genai library not installed"
+    return None
+
+
+async def gather_context(db, project: Project, insight_type: str) -> dict:
+    # Everything the prompt depends on; also the input to the insight cache fingerprint
+    today = date.today()
+    total_tasks, done_tasks, overdue_tasks = (await db.execute(select(
+        func.count(Task.id),
+        func.count(case((Task.status == "done", 1))),
+        func.count(case(((Task.due_date < today) & (Task.status != "done"), 1)))
+    ).where(Task.project_id == project.id))).one()
+    total_milestones, completed_milestones = (await db.execute(select(
+        func.count(Milestone.id),
+        func.count(case((Milestone.completed == True, 1)))
+    ).where(Milestone.project_id == project.id))).one()
+
+    return {
+        "project_id": project.id,
+        "name": project.name,
+        "description": project.description,
+        "status": project.status,
+        "priority": project.priority,
+        "total_tasks": total_tasks,
+        "done_tasks": done_tasks,
+        "overdue_tasks": overdue_tasks,
+        "total_milestones": total_milestones,
+        "completed_milestones": completed_milestones,
+        "insight_type": insight_type,
+    }
+
+
+def render_prompt(context: dict) -> str:
+    task_summary = f"Total Tasks: {context['total_tasks']}. Done: {context['done_tasks']}. Overdue: {context['overdue_tasks']}."
+    milestone_summary = f"Total Milestones: {context['total_milestones']}. Completed: {context['completed_milestones']}."
+
+    return f"""
+    Analyze the project "{context['name']}" ({context['description'] or 'No description'}).
+    Status: {context['status']}. Priority: {context['priority']}.
+    Tasks Summary: {task_summary}
+    Milestones Summary: {milestone_summary}
+
+    Please provide a {context['insight_type']} (e.g. risk_assessment, progress_summary, resource_analysis).
+    Focus on potential risks, progress blockers, or resource allocation issues if applicable.
+    Be concise and professional.
+    """
+
+
+async def enqueue(db, user_id: str, project_id: int, insight_type: str, requested_by: str) -> InsightJob:
+    # A queued or running job for the same project and type is reused instead of duplicated
+    existing = (await db.execute(
+        select(InsightJob).where(
+            InsightJob.project_id == project_id,
+            InsightJob.insight_type == insight_type,
+            InsightJob.status.in_(ACTIVE_STATUSES)
+        ).order_by(InsightJob.id.desc())
+    )).scalars().first()
+    if existing:
+        return existing
+
+    window_start = datetime.now(timezone.utc) - timedelta(seconds=RATE_WINDOW_SECONDS)
+    recent = await db.scalar(select(func.count(InsightJob.id)).where(
+        InsightJob.user_id == user_id,
+        InsightJob.created_at >= window_start
+    ))
+    if recent >= RATE_LIMIT:
+        raise RateLimited(f"Insight limit reached ({RATE_LIMIT} per {RATE_WINDOW_SECONDS}s), try again shortly")
+    if backlog() >= MAX_PENDING:
+        raise QueueFull("Too many insight requests in progress, try again shortly")
+
+    job = InsightJob(
+        project_id=project_id,
+        user_id=user_id,
+        insight_type=insight_type,
+        status="queued",
+        attempts=0,
+        requested_by=requested_by,
+        created_at=datetime.now(timezone.utc)
+    )
+    db.add(job)
+    await db.commit()
+    submit(job.id)
+    return job
+
+
+async def run_job(job_id: int):
+    async with AsyncSessionLocal() as db:
+        # Atomic claim so a job is never run twice, even if it was queued twice
+        claimed = await db.execute(
+            update(InsightJob)
+            .where(InsightJob.id == job_id, InsightJob.status == "queued")
+            .values(status="running", attempts=InsightJob.attempts + 1)
+        )
+        await db.commit()
+        if claimed.rowcount != 1:
+            return
+
+        job = await db.get(InsightJob, job_id)
+        project = await db.get(Project, job.project_id)
+        if project is None:
+            job.status = "failed"
+            job.error = "Project not found"
+            job.finished_at = func.now()
+            await db.commit()
+            return
+
+        try:
+            context = await gather_context(db, project, job.insight_type)
+            started = time.perf_counter()
+            content = await _backend(render_prompt(context))
+            insight_cache.record_generation(time.perf_counter() - started)
+        except Exception as e:
+            job.error = str(e)[:1000]
+            if job.attempts < MAX_ATTEMPTS:
+                job.status = "queued"
+                await db.commit()
+                delay = BACKOFF_SECONDS * (2 ** (job.attempts - 1)) * random.uniform(0.8, 1.2)
+                logger.warning("insight job %s attempt %s failed, retrying in %.1fs: %s", job_id, job.attempts, delay, e)
+                asyncio.get_running_loop().call_later(delay, submit, job_id)
+            else:
+                job.status = "failed"
+                job.finished_at = func.now()
+                await db.commit()
+                logger.error("insight job %s failed after %s attempts: %s", job_id, job.attempts, e)
+            return
+
+        insight = ProjectInsight(
+            project_id=project.id,
+            insight_type=job.insight_type,
+            content=content,
+            model_used=_model_used,
+            requested_by=job.requested_by,
+            fingerprint=insight_cache.fingerprint(context)
+        )
+        db.add(insight)
+        await db.flush()
+        job.insight_id = insight.id
+        job.status = "succeeded"
+        job.error = None
+        job.finished_at = func.now()
+        await db.commit()
+        await cache.invalidate_tenant(project.user_id)
+
+
+_queue = None
+_workers = []
+
+def backlog() -> int:
+    return _queue.qsize() if _queue is not None else 0
+
+def submit(job_id: int):
+    if _queue is not None:
+        _queue.put_nowait(job_id)
+
+async def _worker():
+    while True:
+        job_id = await _queue.get()
+        try:
+            await run_job(job_id)
+        except Exception:
+            logger.exception("insight job %s crashed", job_id)
+        finally:
+            _queue.task_done()
+
+async def start():
+    global _queue
+    _queue = asyncio.Queue()
+    _workers.extend(asyncio.create_task(_worker()) for _ in range(WORKERS))
+
+    # Pick up work left behind by a previous process
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=STALE_SECONDS)
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(InsightJob)
+            .where(InsightJob.status == "running", InsightJob.updated_at < stale_before)
+            .values(status="queued")
+        )
+        await db.commit()
+        pending = (await db.execute(select(InsightJob.id).where(InsightJob.status == "queued"))).scalars().all()
+    for job_id in pending:
+        submit(job_id)
+
+async def stop():
+    global _queue
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
@@ -1,13 +1,28 @@
+import logging
+import time
+
+# Boot report (see report_boot below): time from here to the end of this module
+# is the app's import time
+_boot_started = time.perf_counter()
+
 from fastapi import FastAPI, Depends, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
-from app.database import engine, Base, get_db
+from fastapi.responses import JSONResponse, RedirectResponse, PlainTextResponse
+import os
+from app.database import engine, async_engine, replica_engine, Base, get_db, StickyPrimaryMiddleware
+from app import assets, auth, compression, etags, events, jobs, metrics, migrate
 import app.routes as routes_module
 
 # Start imports for viv-auth and viv-pay
 from viv_auth import init_auth
 from viv_pay import init_pay
 
+logger = logging.getLogger(__name__)
+
+# Startup (import + startup hooks) above this logs a warning; bench/boot.py checks the same budget
+BOOT_BUDGET_MS = float(os.environ.get("BOOT_BUDGET_MS", "1500"))
+# Development convenience: migrate in the startup hook instead of as a deploy step
+MIGRATE_ON_STARTUP = os.environ.get("MIGRATE_ON_STARTUP", "0") == "1"
+
 app = FastAPI()
 
 # Health check (must be first)
@@ -20,6 +35,23 @@ def health_check():
 def api_health_check():
     return {"status": "ok"}
 
+# Auth / subscription timing and billing-webhook cache invalidation (see app/auth.py)
+app.add_middleware(auth.TimingMiddleware)
+
+# Read-your-writes for the optional read replica (see app/database.py)
+app.add_middleware(StickyPrimaryMiddleware)
+
+# ETag / Cache-Control on pages that passed etags.check (see app/etags.py)
+app.add_middleware(etags.ETagMiddleware)
+
+# gzip / brotli for HTML, JSON and other text bodies over COMPRESS_MIN_BYTES
+# (see app/compression.py). Outside the ETag middleware, so it weakens the tags.
+app.add_middleware(compression.CompressionMiddleware)
+
+# Per-request SQL counts and phase timings: Server-Timing, request log, /metrics
+# (see app/metrics.py). Registered last so it wraps the middlewares above.
+app.add_middleware(metrics.RequestMetricsMiddleware)
+
 # Initialize Auth
 User, require_auth = init_auth(app, engine, Base, get_db, app_name="Project Tracker")
 
@@ -29,8 +61,10 @@ create_checkout, get_customer, require_subscription = init_pay(app, engine, Base
 # Wrapper: chain auth -> subscription check so require_subscription gets user_id
 # viv-auth uses encrypted session cookie (viv_session), not a user_id cookie,
 # so require_subscription can't find user_id on its own.
-async def require_active_subscription(request: Request, user=Depends(require_auth)):
-    return await require_subscription(request, user_id=user.id)
+# Depending on the get_current_user placeholder (not require_auth itself) lets
+# FastAPI reuse the route's user instead of decrypting the session twice.
+async def require_active_subscription(request: Request, user=Depends(routes_module.get_current_user)):
+    return await auth.cached_subscription(request, user.id, require_subscription)
 
 # Inject dependencies into routes module
 routes_module.User = User
@@ -40,11 +74,30 @@ routes_module.create_checkout = create_checkout
 routes_module.get_customer = get_customer
 
 # Override dependency getters
-app.dependency_overrides[routes_module.get_current_user] = require_auth
+app.dependency_overrides[routes_module.get_current_user] = auth.timed_auth(require_auth)
 app.dependency_overrides[routes_module.get_active_subscription] = require_active_subscription
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Operator endpoints (worker-wide numbers, not tenant data); set METRICS_TOKEN
+# to require "Authorization: Bearer <token>"
+def operator_allowed(request: Request) -> bool:
+    token = os.environ.get("METRICS_TOKEN")
+    return not token or request.headers.get("authorization") == f"Bearer {token}"
+
+@app.get("/api/auth-stats")
+def auth_stats(request: Request):
+    if not operator_allowed(request):
+        return JSONResponse(status_code=403, content={"error": "forbidden"})
+    return auth.stats()
+
+# Prometheus text format
+@app.get("/metrics")
+def prometheus_metrics(request: Request):
+    if not operator_allowed(request):
+        return PlainTextResponse("forbidden", status_code=403)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Static files: fingerprinted URLs are immutable and precompressed (see app/assets.py)
+app.mount("/static", assets.StaticAssets(), name="static")
 
 # Include routers
 app.include_router(routes_module.dashboard.router)
@@ -52,13 +105,53 @@ app.include_router(routes_module.projects.router)
 app.include_router(routes_module.tasks.router)
 app.include_router(routes_module.milestones.router)
 app.include_router(routes_module.insights.router)
+app.include_router(routes_module.search.router)
+app.include_router(routes_module.events.router)
 app.include_router(routes_module.billing.router)
 
+_boot = {"import_ms": (time.perf_counter() - _boot_started) * 1000}
+
 # Startup event
 @app.on_event("startup")
 def startup_event():
-    # Ensure all tables are created
-    # This includes User (from viv-auth), Billing tables (from viv-pay), and Project/Task/etc (from app.models)
-    # We must import app.models so models are registered in Base
-    import app.models
-    Base.metadata.create_all(bind=engine)
+    _boot["startup_started"] = time.perf_counter()
+    # The schema is created / upgraded by `python -m app.migrate`, run once per
+    # deploy before the workers start (see app/migrate.py). Workers only check it.
+    if MIGRATE_ON_STARTUP:
+        migrate.upgrade(engine)
+    else:
+        migrate.check(engine)
+
+@app.on_event("startup")
+async def start_insight_workers():
+    # Background pool that runs queued AI insight jobs (see app/jobs.py)
+    await jobs.start()
+
+@app.on_event("startup")
+def report_boot():
+    # Registered after the other startup hooks, so it runs last
+    startup_ms = (time.perf_counter() - _boot.pop("startup_started")) * 1000
+    _boot["startup_ms"] = startup_ms
+    total_ms = _boot["import_ms"] + startup_ms
+    metrics.set_gauge("viva_boot_import_seconds", "Time to import app.main", _boot["import_ms"] / 1000)
+    metrics.set_gauge("viva_boot_startup_seconds", "Time spent in startup hooks", startup_ms / 1000)
+    logger.log(
+        logging.WARNING if total_ms > BOOT_BUDGET_MS else logging.INFO,
+        "boot: import %.0fms, startup %.0fms, total %.0fms (budget %.0fms)",
+        _boot["import_ms"], startup_ms, total_ms, BOOT_BUDGET_MS
+    )
+
+@app.on_event("shutdown")
+async def stop_insight_workers():
+    await jobs.stop()
+
+@app.on_event("shutdown")
+async def close_live_updates():
+    await events.close()
+
+@app.on_event("shutdown")
+async def close_database_pool():
+    # Pooled aiosqlite connections run on non-daemon threads; close them so the process can exit
+    await async_engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
@@ -0,0 +1,213 @@
+import contextvars
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from fastapi.templating import Jinja2Templates
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+# Per-request performance instrumentation.
+#
+# RequestMetricsMiddleware opens a request record in a contextvar. Everything below adds to
+# it while the request runs:
+#   - SQLAlchemy cursor events (instrument_engine, hooked up in app/database.py)
+#     count statements and DB time on every engine, sync or async
+#   - timer(name) / record(name, ms) for named phases: auth and subscription
+#     (app/auth.py), template rendering (TimedTemplates), the Gemini call
+#     (app/gemini.py)
+# At the end of the request the record becomes a Server-Timing header, one
+# JSON log line on the "app.metrics" logger (WARNING above SLOW_REQUEST_MS)
+# and observations in the per-route histograms served by render() at /metrics.
+# Work outside a request (insight jobs, background seeding) still feeds the
+# histograms, under route="background".
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "500"))
+REQUEST_LOG = os.environ.get("REQUEST_LOG", "1") == "1"
+QUIET_PATHS = ("/health", "/api/health", "/metrics")
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple, buckets: tuple):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, values: tuple, amount: float):
+        series = self._series.get(values)
+        if series is None:
+            series = self._series[values] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if amount <= bound:
+                series[i] += 1
+        series[-2] += amount
+        series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, series in sorted(self._series.items()):
+            labels = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, values))
+            for bound, n in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {n}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {series[-1]}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "viva_request_duration_seconds", "Request latency", ("method", "route", "status"), DURATION_BUCKETS
+)
+REQUEST_STATEMENTS = Histogram(
+    "viva_request_db_statements", "SQL statements per request", ("method", "route"), STATEMENT_BUCKETS
+)
+REQUEST_DB_SECONDS = Histogram(
+    "viva_request_db_seconds", "Time spent in SQL per request", ("method", "route"), DURATION_BUCKETS
+)
+PHASE_SECONDS = Histogram(
+    "viva_phase_seconds", "Time per request phase (auth, subscription, render, gemini)", ("phase", "route"), DURATION_BUCKETS
+)
+HISTOGRAMS = (REQUEST_SECONDS, REQUEST_STATEMENTS, REQUEST_DB_SECONDS, PHASE_SECONDS)
+
+_totals = {"statements": 0, "db_seconds": 0.0}
+_gauges = {}  # name -> (help, value)
+
+
+def set_gauge(name: str, help: str, value: float):
+    _gauges[name] = (help, value)
+
+
+def current():
+    # The running request's record ({"timings": {name: ms}, "statements": n}), or None
+    return _current.get()
+
+
+def record(name: str, ms: float):
+    state = _current.get()
+    if state is None:
+        PHASE_SECONDS.observe((name, "background"), ms / 1000)
+        return
+    state["timings"][name] = state["timings"].get(name, 0.0) + ms
+
+
+@contextmanager
+def timer(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - started) * 1000)
+
+
+class TimedTemplates(Jinja2Templates):
+    # TemplateResponse renders eagerly, so timing the call times the render
+    def TemplateResponse(self, *args, **kwargs):
+        with timer("render"):
+            return super().TemplateResponse(*args, **kwargs)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    _totals["statements"] += 1
+    _totals["db_seconds"] += elapsed
+    state = _current.get()
+    if state is not None:
+        state["statements"] += 1
+        state["timings"]["db"] = state["timings"].get("db", 0.0) + elapsed * 1000
+
+
+def instrument_engine(sync_engine):
+    # Async engines: pass engine.sync_engine. The contextvar reaches these hooks
+    # because SQLAlchemy runs them in a greenlet sharing the caller's context.
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    return sync_engine
+
+
+def _route_of(scope) -> str:
+    # The route template (/projects/{id}), not the raw path, to keep label cardinality bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class RequestMetricsMiddleware:
+    # Plain ASGI: the app runs in this task, so the record set here is the one
+    # every layer below sees. It is closed on the response start message, as
+    # Server-Timing is a header; a streaming body is timed to its first byte.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        state = {"timings": {}, "statements": 0}
+        token = _current.set(state)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000
+                server_timing = _observe(scope, message["status"], state, total_ms)
+                MutableHeaders(scope=message).append("Server-Timing", server_timing)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+
+
+def _observe(scope, status: int, state: dict, total_ms: float) -> str:
+    # Histograms and request log for a finished request; returns its Server-Timing value
+    method, route, timings = scope["method"], _route_of(scope), state["timings"]
+    REQUEST_SECONDS.observe((method, route, str(status)), total_ms / 1000)
+    REQUEST_STATEMENTS.observe((method, route), state["statements"])
+    REQUEST_DB_SECONDS.observe((method, route), timings.get("db", 0.0) / 1000)
+    for name, ms in timings.items():
+        if name != "db":
+            PHASE_SECONDS.observe((name, route), ms / 1000)
+
+    if REQUEST_LOG and scope["path"] not in QUIET_PATHS:
+        line = json.dumps({
+            "event": "request", "method": method, "route": route, "path": scope["path"],
+            "status": status, "duration_ms": round(total_ms, 1),
+            "db_statements": state["statements"],
+            "timings_ms": {name: round(ms, 1) for name, ms in timings.items()},
+        })
+        logger.log(logging.WARNING if total_ms > SLOW_REQUEST_MS else logging.INFO, line)
+
+    entries = [f'db;dur={timings.get("db", 0.0):.1f};desc="statements: {state["statements"]}"']
+    entries += [f"{name};dur={ms:.1f}" for name, ms in timings.items() if name != "db"]
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(entries)
+
+
+def render() -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+    lines += [
+        "# HELP viva_db_statements_total SQL statements executed by this worker",
+        "# TYPE viva_db_statements_total counter",
+        f"viva_db_statements_total {_totals['statements']}",
+        "# HELP viva_db_seconds_total Time spent in SQL by this worker",
+        "# TYPE viva_db_seconds_total counter",
+        f"viva_db_seconds_total {_totals['db_seconds']:.6f}",
+    ]
+    for name, (help, value) in sorted(_gauges.items()):
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {value:.6f}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,149 @@
+# Versioned schema migrations: python -m app.migrate
+# Applied versions are recorded in schema_migrations. Each step inspects the
+# live schema first, so it is safe both on a fresh database (where baseline
+# already builds the current models) and on one made by an older create_all.
+#
+# Migrating is a deploy step run once before the workers start (see the
+# Dockerfile), not part of app startup: the app only calls check(), one
+# query that refuses to boot against an out-of-date schema. On Postgres,
+# concurrent upgrade() runs (several containers deploying at once) serialize
+# on an advisory lock.
+import logging
+
+from sqlalchemy import Column, Integer, String, DateTime, MetaData, Table, inspect, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.database import engine, Base
+
+logger = logging.getLogger(__name__)
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def _model_tables():
+    import app.models as models
+    return [models.Project.__table__, models.Task.__table__, models.Milestone.__table__,
+            models.TimeEntry.__table__, models.ProjectInsight.__table__, models.InsightJob.__table__,
+            models.ProjectSummary.__table__]
+
+
+def _add_column(conn, table: str, column: str, ddl_type: str):
+    if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def baseline(conn):
+    # Every table registered on Base, including the viv-auth and viv-pay ones.
+    # Import what registers them first, whoever calls upgrade(): the models,
+    # and app.main, whose init_auth / init_pay calls define the other tables.
+    import app.models  # noqa: F401
+    import app.main  # noqa: F401
+    Base.metadata.create_all(bind=conn)
+
+
+def insight_fingerprint(conn):
+    _add_column(conn, "project_insights", "fingerprint", "VARCHAR(64)")
+
+
+def hot_path_indexes(conn):
+    for table in _model_tables():
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+def project_summaries(conn):
+    from app import models, rollups
+    models.ProjectSummary.__table__.create(bind=conn, checkfirst=True)
+    for index in models.ProjectSummary.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+    # Backfill from the existing rows
+    with Session(bind=conn) as session:
+        rollups.rebuild(session)
+        session.flush()
+
+
+def search_index(conn):
+    from app import search
+    search.install(conn)
+
+
+def search_stemming(conn):
+    # SQLite only: rebuild search_index with the porter tokenizer
+    from app import search
+    if conn.dialect.name == "sqlite":
+        search.reinstall(conn)
+
+
+def tenant_versions(conn):
+    from app import models
+    models.TenantVersion.__table__.create(bind=conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, "baseline", baseline),
+    (2, "insight_fingerprint", insight_fingerprint),
+    (3, "hot_path_indexes", hot_path_indexes),
+    (4, "project_summaries", project_summaries),
+    (5, "search_index", search_index),
+    (6, "search_stemming", search_stemming),
+    (7, "tenant_versions", tenant_versions),
+]
+
+
+ADVISORY_LOCK_ID = 7215001  # arbitrary, shared by every process running upgrade()
+
+
+def upgrade(bind=engine):
+    with bind.connect() as lock:
+        if bind.dialect.name == "postgresql":
+            lock.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+        try:
+            _upgrade(bind)
+        finally:
+            if bind.dialect.name == "postgresql":
+                lock.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+
+
+def _upgrade(bind):
+    with bind.begin() as conn:
+        migration_metadata.create_all(bind=conn)
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    for version, name, step in MIGRATIONS:
+        if version in applied:
+            continue
+        # One transaction per step so a failure leaves earlier steps recorded
+        with bind.begin() as conn:
+            step(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name))
+        logger.info("applied migration %s %s", version, name)
+
+
+def pending(bind=engine) -> list:
+    # [(version, name)] not yet applied; all of them on a database never migrated
+    with bind.connect() as conn:
+        if not inspect(conn).has_table(schema_migrations.name):
+            return [(version, name) for version, name, _ in MIGRATIONS]
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in applied]
+
+
+def check(bind=engine):
+    missing = pending(bind)
+    if missing:
+        names = ", ".join(f"{version} {name}" for version, name in missing)
+        raise RuntimeError(f"Database schema is not up to date (pending: {names}); run python -m app.migrate")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    upgrade()
@@ -1,11 +1,25 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Float, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Float, Boolean, ForeignKey, Enum, Index, desc
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
+from datetime import datetime, timezone
 import enum
 
+
+def utcnow():
+    # Python-side so updates get microsecond resolution on SQLite too (CURRENT_TIMESTAMP
+    # is whole seconds)
+    return datetime.now(timezone.utc)
+
+# Indexes are matched to the route predicates: every list is scoped by
+# Project.user_id, then filtered by project_id plus status / due_date / date.
+# New ones must also be added to the schema through app/migrate.py.
+
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        Index("ix_projects_user_id_status", "user_id", "status"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String, nullable=False)  # who owns this project (from auth)
     name = Column(String(200), nullable=False)
@@ -16,15 +30,21 @@ class Project(Base):
     due_date = Column(Date, nullable=True)
     budget = Column(Float, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=utcnow)
 
     tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan")
     milestones = relationship("Milestone", back_populates="project", cascade="all, delete-orphan")
     insights = relationship("ProjectInsight", back_populates="project", cascade="all, delete-orphan")
+    insight_jobs = relationship("InsightJob", back_populates="project", cascade="all, delete-orphan")
+    summary = relationship("ProjectSummary", back_populates="project", uselist=False, cascade="all, delete-orphan")
 
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_project_id_status", "project_id", "status"),
+        Index("ix_tasks_project_id_due_date", "project_id", "due_date"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     title = Column(String(200), nullable=False)
@@ -36,7 +56,7 @@ class Task(Base):
     estimated_hours = Column(Float, nullable=True)
     actual_hours = Column(Float, default=0.0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=utcnow)
 
     project = relationship("Project", back_populates="tasks")
     time_entries = relationship("TimeEntry", back_populates="task", cascade="all, delete-orphan")
@@ -44,6 +64,10 @@ class Task(Base):
 
 class Milestone(Base):
     __tablename__ = "milestones"
+    __table_args__ = (
+        Index("ix_milestones_project_id_due_date", "project_id", "due_date"),
+        Index("ix_milestones_project_id_completed_due_date", "project_id", "completed", "due_date"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     title = Column(String(200), nullable=False)
@@ -58,6 +82,11 @@ class Milestone(Base):
 
 class TimeEntry(Base):
     __tablename__ = "time_entries"
+    __table_args__ = (
+        Index("ix_time_entries_task_id", "task_id"),
+        Index("ix_time_entries_user_id_date", "user_id", "date"),
+        Index("ix_time_entries_user_id_created_at", "user_id", desc("created_at")),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
     user_id = Column(String, nullable=False)
@@ -71,6 +100,10 @@ class TimeEntry(Base):
 
 class ProjectInsight(Base):
     __tablename__ = "project_insights"
+    __table_args__ = (
+        Index("ix_project_insights_project_id_generated_at", "project_id", desc("generated_at")),
+        Index("ix_project_insights_project_id_fingerprint", "project_id", "fingerprint"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     insight_type = Column(String, nullable=False) # risk_assessment, progress_summary, resource_analysis
@@ -78,5 +111,65 @@ class ProjectInsight(Base):
     model_used = Column(String, nullable=True)
     generated_at = Column(DateTime(timezone=True), server_default=func.now())
     requested_by = Column(String, nullable=True)
+    fingerprint = Column(String(64), nullable=True) # sha256 of the prompt inputs, see app/insight_cache.py
 
     project = relationship("Project", back_populates="insights")
+
+
+class InsightJob(Base):
+    __tablename__ = "insight_jobs"
+    __table_args__ = (
+        Index("ix_insight_jobs_project_id_insight_type_status", "project_id", "insight_type", "status"),
+        Index("ix_insight_jobs_user_id_created_at", "user_id", "created_at"),
+        Index("ix_insight_jobs_status", "status"),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    user_id = Column(String, nullable=False)
+    insight_type = Column(String, nullable=False)
+    status = Column(String, default="queued") # queued, running, succeeded, failed
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    insight_id = Column(Integer, ForeignKey("project_insights.id"), nullable=True)
+    requested_by = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    project = relationship("Project", back_populates="insight_jobs")
+    insight = relationship("ProjectInsight")
+
+
+class ProjectSummary(Base):
+    # Per-project rollup kept current by the write paths, see app/rollups.py
+    __tablename__ = "project_summaries"
+    __table_args__ = (
+        Index("ix_project_summaries_user_id", "user_id"),
+    )
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    user_id = Column(String, nullable=False)
+    tasks_todo = Column(Integer, default=0)
+    tasks_in_progress = Column(Integer, default=0)
+    tasks_review = Column(Integer, default=0)
+    tasks_done = Column(Integer, default=0)
+    tasks_blocked = Column(Integer, default=0)
+    total_tasks = Column(Integer, default=0)
+    estimated_hours = Column(Float, default=0.0)
+    actual_hours = Column(Float, default=0.0)
+    overdue_tasks = Column(Integer, default=0)
+    overdue_milestones = Column(Integer, default=0)
+    next_milestone_id = Column(Integer, nullable=True)
+    next_milestone_title = Column(String(200), nullable=True)
+    next_milestone_due_date = Column(Date, nullable=True)
+    as_of = Column(Date, nullable=False) # overdue counts are relative to this date
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    project = relationship("Project", back_populates="summary")
+
+
+class TenantVersion(Base):
+    # Per-tenant data generation for CACHE_BACKEND=memory, shared by every
+    # worker through the database (see app/cache.py)
+    __tablename__ = "tenant_versions"
+    user_id = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
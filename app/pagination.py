@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Keyset (cursor) pagination: a page is "the next `limit` rows after the last
+# row the client saw" in a fixed (sort columns..., id) order, so the cost of a
+# page does not depend on how deep into the list it is.
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *parsers) -> list:
+    # parsers turn the JSON values back into column values, e.g. (date.fromisoformat, int)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if len(values) != len(parsers):
+            raise ValueError("cursor length mismatch")
+        return [parse(value) for parse, value in zip(parsers, values)]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def after(columns, values, descending: bool = False):
+    # Rows strictly past the cursor in (columns) order
+    if len(columns) == 1:
+        return columns[0] < values[0] if descending else columns[0] > values[0]
+    if descending:
+        return tuple_(*columns) < tuple_(*values)
+    return tuple_(*columns) > tuple_(*values)
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+
+
+def page(rows: list, limit: int, cursor_of):
+    # Callers fetch limit + 1 rows; the extra one only tells us there is a next page
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = cursor_of(rows[-1]) if has_more and rows else None
+    return rows, next_cursor
+
+
+def parse_date(value: str, name: str):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be YYYY-MM-DD")
@@ -0,0 +1,155 @@
+# Per-project rollups (ProjectSummary): task counts per status, done %, hours,
+# overdue counts and the next open milestone.
+#
+# Every task / time-entry / milestone write calls refresh() for the projects it
+# touched before committing, so the summary changes in the same transaction as
+# the rows it is derived from. Reads then cost O(projects) instead of O(tasks).
+#
+# Overdue counts depend on the date: a row whose as_of is not today is
+# recomputed on first read that day (see fresh()).
+#
+# Drift repair (e.g. after editing rows by hand): python -m app.rollups
+import logging
+from datetime import date
+
+from sqlalchemy import select, func, case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import writable
+from app.models import Project, Task, Milestone, ProjectSummary
+
+logger = logging.getLogger(__name__)
+
+TASK_STATUSES = ["todo", "in_progress", "review", "done", "blocked"]
+REBUILD_BATCH_SIZE = 500
+
+
+def _empty(project_id: int, user_id: str, today: date) -> dict:
+    values = {f"tasks_{s}": 0 for s in TASK_STATUSES}
+    values.update(
+        project_id=project_id, user_id=user_id, total_tasks=0,
+        estimated_hours=0.0, actual_hours=0.0, overdue_tasks=0, overdue_milestones=0,
+        next_milestone_id=None, next_milestone_title=None, next_milestone_due_date=None,
+        as_of=today
+    )
+    return values
+
+
+def refresh_sync(session: Session, project_ids, today: date = None) -> dict:
+    # Recompute the summaries of project_ids inside the session's transaction.
+    # Returns {project_id: ProjectSummary}; deleted projects are skipped.
+    today = today or date.today()
+    project_ids = sorted(set(project_ids))
+    if not project_ids:
+        return {}
+    # Sessions here do not autoflush; the caller's pending writes must be visible
+    session.flush()
+
+    # Lock existing rows first (no-op on SQLite) so concurrent writers to one
+    # project recompute one after the other and the last one sees both changes
+    summaries = {s.project_id: s for s in session.scalars(
+        select(ProjectSummary).where(ProjectSummary.project_id.in_(project_ids)).with_for_update()
+    )}
+
+    values = {
+        project_id: _empty(project_id, user_id, today)
+        for project_id, user_id in session.execute(
+            select(Project.id, Project.user_id).where(Project.id.in_(project_ids))
+        )
+    }
+
+    task_rows = session.execute(
+        select(
+            Task.project_id, Task.status, func.count(Task.id),
+            func.coalesce(func.sum(Task.estimated_hours), 0.0),
+            func.coalesce(func.sum(Task.actual_hours), 0.0),
+            func.count(case(((Task.due_date < today) & (Task.status != "done"), 1)))
+        ).where(Task.project_id.in_(project_ids)).group_by(Task.project_id, Task.status)
+    )
+    for project_id, status, n, estimated, actual, overdue in task_rows:
+        row = values.get(project_id)
+        if row is None:
+            continue
+        if status in TASK_STATUSES:
+            row[f"tasks_{status}"] = n
+        row["total_tasks"] += n
+        row["estimated_hours"] += estimated
+        row["actual_hours"] += actual
+        row["overdue_tasks"] += overdue
+
+    ranked = select(
+        Milestone.project_id, Milestone.id, Milestone.title, Milestone.due_date,
+        func.count(case((Milestone.due_date < today, 1))).over(partition_by=Milestone.project_id).label("overdue"),
+        func.row_number().over(
+            partition_by=Milestone.project_id, order_by=(Milestone.due_date, Milestone.id)
+        ).label("rn")
+    ).where(Milestone.project_id.in_(project_ids), Milestone.completed == False).subquery()
+    for milestone in session.execute(select(ranked).where(ranked.c.rn == 1)):
+        row = values.get(milestone.project_id)
+        if row is None:
+            continue
+        row.update(
+            overdue_milestones=milestone.overdue, next_milestone_id=milestone.id,
+            next_milestone_title=milestone.title, next_milestone_due_date=milestone.due_date
+        )
+
+    for project_id, row in values.items():
+        summary = summaries.get(project_id)
+        if summary is None:
+            summary = summaries[project_id] = ProjectSummary(project_id=project_id)
+            session.add(summary)
+        for key, value in row.items():
+            setattr(summary, key, value)
+    return {project_id: summaries[project_id] for project_id in values}
+
+
+async def refresh(db, project_ids, today: date = None) -> dict:
+    return await db.run_sync(refresh_sync, project_ids, today)
+
+
+async def fresh(db, summaries: dict, today: date = None) -> dict:
+    # Read-side helper: given {project_id: ProjectSummary or None} from an outer
+    # join, recompute the missing / out-of-date ones and commit them
+    today = today or date.today()
+    stale = [project_id for project_id, summary in summaries.items() if summary is None or summary.as_of != today]
+    if not stale:
+        return summaries
+    async with writable(db) as primary:
+        summaries = {**summaries, **await refresh(primary, stale, today)}
+        try:
+            await primary.commit()
+        except IntegrityError:
+            # A concurrent request created the same rows; ours are still correct to show
+            await primary.rollback()
+    return summaries
+
+
+async def refresh_tenant(db, user_id: str, today: date = None):
+    # Bring every stale / missing summary of one tenant up to date
+    today = today or date.today()
+    rows = (await db.execute(
+        select(Project.id, ProjectSummary)
+        .outerjoin(ProjectSummary, ProjectSummary.project_id == Project.id)
+        .where(Project.user_id == user_id)
+    )).all()
+    return await fresh(db, dict(rows), today)
+
+
+def rebuild(session: Session, today: date = None) -> int:
+    # Recompute every project's summary in batches; returns the number of projects
+    project_ids = session.scalars(select(Project.id).order_by(Project.id)).all()
+    for start in range(0, len(project_ids), REBUILD_BATCH_SIZE):
+        refresh_sync(session, project_ids[start:start + REBUILD_BATCH_SIZE], today)
+        session.flush()
+        session.expunge_all()
+    return len(project_ids)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from app.database import SessionLocal
+    with SessionLocal() as session:
+        count = rebuild(session)
+        session.commit()
+    logger.info("rebuilt %s project summaries", count)
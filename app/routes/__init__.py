@@ -1,3 +1,7 @@
+from fastapi import Depends, Request
+
+from app import etags
+
 # Placeholders for dependency injection from main.py
 User = None
 require_auth = None
@@ -11,5 +15,9 @@ def get_current_user():
 def get_active_subscription():
     pass
 
+async def check_etag(request: Request, user=Depends(get_current_user), _=Depends(get_active_subscription)):
+    # 304 for an unchanged page before the route queries anything (see app/etags.py)
+    await etags.check(request, str(user.id))
+
 # Import route modules so they can be accessed by main.py
-from . import dashboard, projects, tasks, milestones, insights, billing
+from . import dashboard, projects, tasks, milestones, insights, billing, search, events
@@ -1,13 +1,12 @@
 from fastapi import APIRouter, Depends, Request, status, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 import app.routes as routes_module
 from app.routes import get_current_user
+from app.templating import templates
 from typing import Any
 import os
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/pricing", response_class=HTMLResponse)
 async def pricing_page(request: Request):
@@ -1,122 +1,72 @@
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date, timedelta
 from typing import Any
 
-from app.database import get_db
-from app.models import Project, Task, Milestone, TimeEntry
-from app.routes import get_current_user, get_active_subscription
-from app.seed import seed_data
+from app.database import get_async_db
+from app import aggregates, cache
+from app.templating import templates
+from app.routes import get_current_user, get_active_subscription, check_etag
+from app.seed import seed_in_background
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/", response_class=HTMLResponse)
 async def dashboard(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
-    _ : Any = Depends(get_active_subscription)
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
 ):
-    # Get user projects
-    projects = db.query(Project).filter(Project.user_id == str(user.id)).all()
-    
-    if not projects:
-        seed_data(db, user.id)
-        projects = db.query(Project).filter(Project.user_id == str(user.id)).all()
-
-    user_projects_ids = [p.id for p in projects]
-
-    # 1. Project Overview
-    project_counts = {
-        "planning": 0, "active": 0, "on_hold": 0, "completed": 0, "archived": 0
-    }
-    for p in projects:
-        if p.status in project_counts:
-            project_counts[p.status] += 1
-
-    # 2. My tasks (Tasks in user projects)
-    my_tasks = []
-    if user_projects_ids:
-        my_tasks = db.query(Task).filter(Task.project_id.in_(user_projects_ids)).all()
-    
-    tasks_by_status = {
-        "todo": [], "in_progress": [], "review": [], "done": [], "blocked": []
-    }
-    for t in my_tasks:
-        if t.status in tasks_by_status:
-            tasks_by_status[t.status].append(t)
-
-    # 3. Upcoming deadlines (Next 7 days)
+    user_id = str(user.id)
     today = date.today()
-    next_week = today + timedelta(days=7)
-    
-    upcoming = []
-    if user_projects_ids:
-        upcoming_tasks = db.query(Task).filter(
-            Task.project_id.in_(user_projects_ids),
-            Task.due_date >= today,
-            Task.due_date <= next_week,
-            Task.status != "done"
-        ).all()
-        
-        upcoming_milestones = db.query(Milestone).filter(
-            Milestone.project_id.in_(user_projects_ids),
-            Milestone.due_date >= today,
-            Milestone.due_date <= next_week,
-            Milestone.completed == False
-        ).all()
 
-        for t in upcoming_tasks:
-            upcoming.append({"type": "Task", "title": t.title, "due_date": t.due_date, "project_id": t.project_id, "id": t.id})
-        for m in upcoming_milestones:
-            upcoming.append({"type": "Milestone", "title": m.title, "due_date": m.due_date, "project_id": m.project_id, "id": m.id})
-        
-        upcoming.sort(key=lambda x: x['due_date'])
+    async def load():
+        # 1. Project overview, task status counts and quick stats (one grouped query)
+        counts = await aggregates.dashboard_counts(db, user_id, today)
+
+        # 2. My tasks: a few per status, the rest only counted
+        tasks_by_status = await aggregates.dashboard_tasks(db, user_id)
 
-    # 4. Quick stats
-    total_projects = len(projects)
-    active_tasks = 0
-    overdue_items = 0
-    
-    if user_projects_ids:
-        active_tasks = db.query(Task).filter(
-            Task.project_id.in_(user_projects_ids),
-            Task.status.in_(["todo", "in_progress", "review", "blocked"])
-        ).count()
-        
-        overdue_items = db.query(Task).filter(
-            Task.project_id.in_(user_projects_ids),
-            Task.due_date < today,
-            Task.status != "done"
-        ).count()
+        return {
+            "counts": counts,
+            "tasks_by_status": {s: [t._asdict() for t in tasks] for s, tasks in tasks_by_status.items()},
+            # 3. Upcoming deadlines (Next 7 days)
+            "upcoming": await aggregates.upcoming_deadlines(db, user_id, today),
+            # 4. Recent activity
+            "recent_activity": [e._asdict() for e in await aggregates.recent_activity(db, user_id)]
+        }
 
-    # Hours logged this week
-    start_of_week = today - timedelta(days=today.weekday())
-    hours_logged = db.query(func.sum(TimeEntry.hours)).filter(
-        TimeEntry.user_id == str(user.id),
-        TimeEntry.date >= start_of_week
-    ).scalar() or 0.0
+    # Overdue / upcoming depend on the date, so it is part of the key
+    cache_key = f"dashboard:{today.isoformat()}"
+    data = await cache.cached(user_id, cache_key, load)
 
-    # 5. Recent activity
-    recent_activity = db.query(TimeEntry).filter(
-        TimeEntry.user_id == str(user.id)
-    ).order_by(desc(TimeEntry.created_at)).limit(10).all()
+    # First visit: sample projects are added in the background and the page
+    # reloads itself until they are there
+    seeding = False
+    if data["counts"]["total_projects"] == 0:
+        await seed_in_background(user.id)
+        seeding = True
+    counts = data["counts"]
 
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
         "user": user,
-        "project_counts": project_counts,
-        "tasks_by_status": tasks_by_status,
-        "upcoming": upcoming,
+        "project_counts": counts["projects"],
+        "tasks_by_status": data["tasks_by_status"],
+        "task_counts": counts["tasks"],
+        "upcoming": data["upcoming"],
         "stats": {
-            "total_projects": total_projects,
-            "active_tasks": active_tasks,
-            "hours_logged": hours_logged,
-            "overdue_items": overdue_items
+            "total_projects": counts["total_projects"],
+            "active_tasks": counts["active_tasks"],
+            "hours_logged": counts["hours_logged"],
+            "overdue_items": counts["overdue_items"]
         },
-        "recent_activity": recent_activity
+        "recent_activity": data["recent_activity"],
+        "seeding": seeding,
+        # For the live-update script
+        "active_statuses": aggregates.ACTIVE_TASK_STATUSES,
+        "week_start": (today - timedelta(days=today.weekday())).isoformat()
     })
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from typing import Any
+
+from app import events
+from app.routes import get_current_user, get_active_subscription
+
+router = APIRouter()
+
+@router.get("/events")
+async def live_events(
+    user: Any = Depends(get_current_user),
+    _ : Any = Depends(get_active_subscription)
+):
+    # Server-Sent Events: task / milestone deltas for this tenant (see app/events.py).
+    # The stream never queries, so the route takes no session: an open page
+    # holds no pooled connection (viv-auth's own session is closed, like every
+    # dependency's, before the body starts).
+    return StreamingResponse(
+        events.stream(str(user.id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
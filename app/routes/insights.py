@@ -1,60 +1,113 @@
 from fastapi import APIRouter, Depends, Request, Form, HTTPException, Body
 from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, contains_eager
+from sqlalchemy import select, desc, func
 from typing import Any, List
 import os
 import json
 from datetime import datetime, date
 
-from app.database import get_db
-from app.models import Project, Task, Milestone, TimeEntry, ProjectInsight
-from app.routes import get_current_user, get_active_subscription
+from app.database import get_async_db
+from app.models import Project, Task, Milestone, TimeEntry, ProjectInsight, InsightJob
+from app.routes import get_current_user, get_active_subscription, check_etag
+from app import jobs, insight_cache, pagination
+from app.templating import templates
 from pydantic import BaseModel
 
-try:
-    from google import genai
-except ImportError:
-    genai = None
-
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 class InsightRequest(BaseModel):
     project_id: int
     insight_type: str
+    force_refresh: bool = False
+
+INSIGHT_PAGE_SIZE = 30
+
+async def insight_page(db: AsyncSession, user_id: str, project_id: int, insight_type: str, cursor: str, limit: int):
+    # Newest first; ids grow with generated_at, so the primary key is the keyset
+    filters = [Project.user_id == user_id]
+    if project_id:
+        filters.append(ProjectInsight.project_id == project_id)
+    if insight_type:
+        filters.append(ProjectInsight.insight_type == insight_type)
+    if cursor:
+        (before_id,) = pagination.decode_cursor(cursor, int)
+        filters.append(pagination.after([ProjectInsight.id], [before_id], descending=True))
+    rows = (await db.execute(
+        select(ProjectInsight).join(ProjectInsight.project)
+        .where(*filters)
+        .options(contains_eager(ProjectInsight.project))
+        .order_by(desc(ProjectInsight.id))
+        .limit(limit + 1)
+    )).scalars().all()
+    return pagination.page(rows, limit, lambda i: pagination.encode_cursor(i.id))
 
 @router.get("/insights", response_class=HTMLResponse)
 async def list_insights(
     request: Request,
-    db: Session = Depends(get_db),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
-    _ : Any = Depends(get_active_subscription)
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
 ):
-    projects = db.query(Project).filter(Project.user_id == str(user.id)).all()
+    projects = (await db.execute(select(Project).where(Project.user_id == str(user.id)))).scalars().all()
     project_ids = [p.id for p in projects]
     
     insights = []
+    next_cursor = None
     if project_ids:
-        insights = db.query(ProjectInsight).filter(ProjectInsight.project_id.in_(project_ids)).order_by(desc(ProjectInsight.generated_at)).all()
+        insights, next_cursor = await insight_page(db, str(user.id), None, None, cursor, INSIGHT_PAGE_SIZE)
         
     return templates.TemplateResponse("insights/dashboard.html", {
         "request": request,
         "user": user,
         "insights": insights,
+        "next_cursor": next_cursor,
         "projects": projects
     })
 
+@router.get("/api/insights")
+async def api_list_insights(
+    project_id: int = None,
+    insight_type: str = None,
+    cursor: str = None,
+    limit: int = pagination.DEFAULT_LIMIT,
+    db: AsyncSession = Depends(get_async_db),
+    user: Any = Depends(get_current_user),
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
+):
+    insights, next_cursor = await insight_page(db, str(user.id), project_id, insight_type, cursor, pagination.clamp_limit(limit))
+
+    return JSONResponse(content={
+        "items": [{
+            "id": i.id,
+            "project_id": i.project_id,
+            "project_name": i.project.name,
+            "insight_type": i.insight_type,
+            "content": i.content,
+            "model_used": i.model_used,
+            "generated_at": i.generated_at.isoformat() if i.generated_at else None
+        } for i in insights],
+        "next_cursor": next_cursor
+    })
+
 @router.get("/insights/{id}", response_class=HTMLResponse)
 async def insight_detail(
     request: Request,
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
-    _ : Any = Depends(get_active_subscription)
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
 ):
-    insight = db.query(ProjectInsight).join(Project).filter(ProjectInsight.id == id, Project.user_id == str(user.id)).first()
+    insight = (await db.execute(
+        select(ProjectInsight).join(ProjectInsight.project)
+        .where(ProjectInsight.id == id, Project.user_id == str(user.id))
+        .options(contains_eager(ProjectInsight.project))
+    )).scalars().first()
     if not insight:
         raise HTTPException(status_code=404, detail="Insight not found")
         
@@ -68,69 +121,64 @@ async def insight_detail(
 async def generate_insight(
     request: Request,
     insight_request: InsightRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
     _ : Any = Depends(get_active_subscription)
 ):
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-         return JSONResponse(status_code=500, content={"error": "GOOGLE_API_KEY not set"})
-         
-    if not genai:
-         return JSONResponse(status_code=500, content={"error": "google-genai library not installed"})
-
-    project = db.query(Project).filter(Project.id == insight_request.project_id, Project.user_id == str(user.id)).first()
+    project = (await db.execute(select(Project).where(Project.id == insight_request.project_id, Project.user_id == str(user.id)))).scalars().first()
     if not project:
         return JSONResponse(status_code=404, content={"error": "Project not found"})
-        
-    # Gather context
-    tasks = db.query(Task).filter(Task.project_id == project.id).all()
-    milestones = db.query(Milestone).filter(Milestone.project_id == project.id).all()
-    
-    done_tasks = [t for t in tasks if t.status == 'done']
-    overdue_tasks = [t for t in tasks if t.due_date and t.due_date < date.today() and t.status != 'done']
-    
-    task_summary = f"Total Tasks: {len(tasks)}. Done: {len(done_tasks)}. Overdue: {len(overdue_tasks)}."
-    
-    completed_milestones = [m for m in milestones if m.completed]
-    milestone_summary = f"Total Milestones: {len(milestones)}. Completed: {len(completed_milestones)}."
-    
-    prompt = f"""
-    Analyze the project "{project.name}" ({project.description or 'No description'}).
-    Status: {project.status}. Priority: {project.priority}.
-    Tasks Summary: {task_summary}
-    Milestones Summary: {milestone_summary}
-    
-    Please provide a {insight_request.insight_type} (e.g. risk_assessment, progress_summary, resource_analysis).
-    Focus on potential risks, progress blockers, or resource allocation issues if applicable.
-    Be concise and professional.
-    """
-    
+
+    # Serve the stored insight if the project looks exactly as it did when it was generated
+    if not insight_request.force_refresh:
+        context = await jobs.gather_context(db, project, insight_request.insight_type)
+        cached = await insight_cache.lookup(db, project.id, insight_cache.fingerprint(context))
+        if cached:
+            return JSONResponse(content={"status": "succeeded", "cached": True, "insight_id": cached.id, "content": cached.content})
+
+    # Only a new generation needs a working backend; cached insights are served without one
+    error = jobs.backend_error()
+    if error:
+        return JSONResponse(status_code=500, content={"error": error})
+
+    requested_by = "user"
+    if hasattr(user, 'email'):
+        requested_by = user.email
+
+    # Generation runs on the background worker pool; the client polls the job
     try:
-        client = genai.Client(api_key=api_key)
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt
-        )
-        content = response.text
-        
-        # Save insight
-        requested_by = "user"
-        if hasattr(user, 'email'):
-            requested_by = user.email
-            
-        new_insight = ProjectInsight(
-            project_id=project.id,
-            insight_type=insight_request.insight_type,
-            content=content,
-            model_used="gemini-2.5-flash",
-            requested_by=requested_by
-        )
-        db.add(new_insight)
-        db.commit()
-        db.refresh(new_insight)
-        
-        return JSONResponse(content={"status": "ok", "insight_id": new_insight.id, "content": content})
-        
-    except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        job = await jobs.enqueue(db, str(user.id), project.id, insight_request.insight_type, requested_by)
+    except jobs.RateLimited as e:
+        return JSONResponse(status_code=429, content={"error": str(e)})
+    except jobs.QueueFull as e:
+        return JSONResponse(status_code=429, content={"error": str(e)}, headers={"Retry-After": "30"})
+
+    return JSONResponse(status_code=202, content={"status": job.status, "job_id": job.id})
+
+@router.get("/api/insights/jobs/{job_id}")
+async def insight_job_status(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user: Any = Depends(get_current_user),
+    _ : Any = Depends(get_active_subscription)
+):
+    job = (await db.execute(
+        select(InsightJob)
+        .where(InsightJob.id == job_id, InsightJob.user_id == str(user.id))
+        .options(selectinload(InsightJob.insight))
+    )).scalars().first()
+    if not job:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+
+    return JSONResponse(content={
+        "job_id": job.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error,
+        "insight_id": job.insight_id,
+        "content": job.insight.content if job.insight else None
+    })
+
+@router.get("/api/insights/cache-stats")
+async def insight_cache_stats(user: Any = Depends(get_current_user)):
+    return JSONResponse(content=insight_cache.stats())
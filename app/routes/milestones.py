@@ -1,39 +1,105 @@
 from fastapi import APIRouter, Depends, Request, Form, HTTPException, status as fastapi_status
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from sqlalchemy import select, desc, func
 from typing import Any
 from datetime import date, datetime
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import Project, Milestone
-from app.routes import get_current_user, get_active_subscription
+from app.routes import get_current_user, get_active_subscription, check_etag
+from app import pagination, cache, events, rollups
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
+
+MILESTONE_PAGE_SIZE = 100
+
+def milestone_filters(user_id: str, project_id: int = None, completed: bool = None,
+                      due_from: date = None, due_to: date = None) -> list:
+    clauses = [Project.user_id == user_id]
+    if project_id:
+        clauses.append(Milestone.project_id == project_id)
+    if completed is not None:
+        clauses.append(Milestone.completed == completed)
+    if due_from:
+        clauses.append(Milestone.due_date >= due_from)
+    if due_to:
+        clauses.append(Milestone.due_date <= due_to)
+    return clauses
+
+async def milestone_page(db: AsyncSession, filters: list, cursor: str, limit: int):
+    # Keyset page in (due_date, id) order
+    if cursor:
+        after_due, after_id = pagination.decode_cursor(cursor, date.fromisoformat, int)
+        filters = filters + [pagination.after([Milestone.due_date, Milestone.id], [after_due, after_id])]
+    rows = (await db.execute(
+        select(Milestone).join(Milestone.project)
+        .where(*filters)
+        .options(contains_eager(Milestone.project))
+        .order_by(Milestone.due_date, Milestone.id)
+        .limit(limit + 1)
+    )).scalars().all()
+    return pagination.page(rows, limit, lambda m: pagination.encode_cursor(m.due_date, m.id))
 
 @router.get("/milestones", response_class=HTMLResponse)
 async def list_milestones(
     request: Request,
-    db: Session = Depends(get_db),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
-    _ : Any = Depends(get_active_subscription)
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
 ):
-    projects = db.query(Project).filter(Project.user_id == str(user.id)).all()
+    projects = (await db.execute(select(Project).where(Project.user_id == str(user.id)))).scalars().all()
     project_ids = [p.id for p in projects]
     
     milestones = []
+    next_cursor = None
     if project_ids:
-        milestones = db.query(Milestone).filter(Milestone.project_id.in_(project_ids)).order_by(Milestone.due_date).all()
+        milestones, next_cursor = await milestone_page(db, milestone_filters(str(user.id)), cursor, MILESTONE_PAGE_SIZE)
         
     return templates.TemplateResponse("milestones/list.html", {
         "request": request,
         "user": user,
         "milestones": milestones,
+        "next_cursor": next_cursor,
         "projects": projects
     })
 
+@router.get("/api/milestones")
+async def api_list_milestones(
+    project_id: int = None,
+    completed: bool = None,
+    due_from: str = None,
+    due_to: str = None,
+    cursor: str = None,
+    limit: int = pagination.DEFAULT_LIMIT,
+    db: AsyncSession = Depends(get_async_db),
+    user: Any = Depends(get_current_user),
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
+):
+    filters = milestone_filters(
+        str(user.id), project_id=project_id, completed=completed,
+        due_from=pagination.parse_date(due_from, "due_from"), due_to=pagination.parse_date(due_to, "due_to")
+    )
+    milestones, next_cursor = await milestone_page(db, filters, cursor, pagination.clamp_limit(limit))
+
+    return JSONResponse(content={
+        "items": [{
+            "id": m.id,
+            "project_id": m.project_id,
+            "project_name": m.project.name,
+            "title": m.title,
+            "description": m.description,
+            "due_date": m.due_date.isoformat(),
+            "completed": m.completed
+        } for m in milestones],
+        "next_cursor": next_cursor
+    })
+
 @router.post("/milestones")
 async def create_milestone(
     request: Request,
@@ -41,11 +107,11 @@ async def create_milestone(
     title: str = Form(...),
     description: str = Form(None),
     due_date: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
     _ : Any = Depends(get_active_subscription)
 ):
-    project = db.query(Project).filter(Project.id == project_id, Project.user_id == str(user.id)).first()
+    project = (await db.execute(select(Project).where(Project.id == project_id, Project.user_id == str(user.id)))).scalars().first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
         
@@ -59,7 +125,9 @@ async def create_milestone(
         completed=False
     )
     db.add(milestone)
-    db.commit()
+    await rollups.refresh(db, [project_id])
+    await db.commit()
+    await cache.invalidate_tenant(str(user.id))
     
     referer = request.headers.get("referer")
     if referer:
@@ -71,17 +139,20 @@ async def create_milestone(
 async def complete_milestone(
     id: int,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
     _ : Any = Depends(get_active_subscription)
 ):
-    milestone = db.query(Milestone).join(Project).filter(Milestone.id == id, Project.user_id == str(user.id)).first()
+    milestone = (await db.execute(select(Milestone).join(Project).where(Milestone.id == id, Project.user_id == str(user.id)))).scalars().first()
     if not milestone:
         raise HTTPException(status_code=404, detail="Milestone not found")
         
     milestone.completed = True
     milestone.completed_at = func.now()
-    db.commit()
+    await rollups.refresh(db, [milestone.project_id])
+    await db.commit()
+    await cache.invalidate_tenant(str(user.id))
+    await events.publish(str(user.id), [events.milestone_delta(milestone)])
     
     referer = request.headers.get("referer")
     if referer:
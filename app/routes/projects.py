@@ -1,53 +1,62 @@
 from fastapi import APIRouter, Depends, Request, Form, HTTPException, status as fastapi_status
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import select, desc, func
 from typing import Any, List
 from datetime import date, datetime
 
-from app.database import get_db
-from app.models import Project, Task, Milestone, TimeEntry, ProjectInsight
-from app.routes import get_current_user, get_active_subscription
+from app.database import get_async_db
+from app import aggregates, cache, rollups
+from app.templating import templates
+from app.models import Project, ProjectSummary, Task, Milestone, TimeEntry, ProjectInsight
+from app.routes import get_current_user, get_active_subscription, check_etag
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/projects", response_class=HTMLResponse)
 async def list_projects(
     request: Request,
     status_filter: str = None,
     sort_by: str = "due_date",
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
-    _ : Any = Depends(get_active_subscription)
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
 ):
-    query = db.query(Project).filter(Project.user_id == str(user.id))
-    
-    if status_filter:
-        query = query.filter(Project.status == status_filter)
-    
-    projects = query.all()
-    
-    if sort_by == "priority":
-        priority_map = {"critical": 0, "high": 1, "medium": 2, "low": 3}
-        projects.sort(key=lambda x: priority_map.get(x.priority, 4))
-    else:
-        # Default due_date
-        # Handle None due dates by putting them at the end or beginning?
-        projects.sort(key=lambda x: x.due_date if x.due_date else date.max)
+    async def load():
+        # Progress comes from the write-maintained summary rows (app/rollups.py)
+        query = (
+            select(Project, ProjectSummary)
+            .outerjoin(ProjectSummary, ProjectSummary.project_id == Project.id)
+            .where(Project.user_id == str(user.id))
+        )
+        
+        if status_filter:
+            query = query.where(Project.status == status_filter)
+        
+        rows = list((await db.execute(query)).all())
+        summaries = await rollups.fresh(db, {p.id: summary for p, summary in rows})
+        
+        if sort_by == "priority":
+            priority_map = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+            rows.sort(key=lambda x: priority_map.get(x.Project.priority, 4))
+        else:
+            # Default due_date
+            # Handle None due dates by putting them at the end or beginning?
+            rows.sort(key=lambda x: x.Project.due_date if x.Project.due_date else date.max)
+
+        project_data = []
+        for p, _summary in rows:
+            summary = summaries[p.id]
+            project_data.append({
+                "project": cache.as_dict(p),
+                "summary": cache.as_dict(summary),
+                "progress": aggregates.progress_percent(summary.total_tasks, summary.tasks_done)
+            })
+        return project_data
 
-    project_data = []
-    for p in projects:
-        total_tasks = len(p.tasks)
-        done_tasks = len([t for t in p.tasks if t.status == "done"])
-        progress = 0
-        if total_tasks > 0:
-            progress = int((done_tasks / total_tasks) * 100)
-        project_data.append({
-            "project": p,
-            "progress": progress
-        })
+    project_data = await cache.cached(str(user.id), f"projects:{status_filter}:{sort_by}", load)
 
     return templates.TemplateResponse("projects/list.html", {
         "request": request, 
@@ -71,7 +80,7 @@ async def create_project(
     start_date: str = Form(None),
     due_date: str = Form(None),
     budget: float = Form(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
     _ : Any = Depends(get_active_subscription)
 ):
@@ -89,49 +98,63 @@ async def create_project(
         budget=budget
     )
     db.add(new_project)
-    db.commit()
-    db.refresh(new_project)
+    await db.flush()
+    await rollups.refresh(db, [new_project.id])
+    await db.commit()
+    await db.refresh(new_project)
+    await cache.invalidate_tenant(str(user.id))
     return RedirectResponse(url=f"/projects/{new_project.id}", status_code=fastapi_status.HTTP_303_SEE_OTHER)
 
 @router.get("/projects/{id}", response_class=HTMLResponse)
 async def project_detail(
     request: Request,
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
-    _ : Any = Depends(get_active_subscription)
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
 ):
-    project = db.query(Project).filter(Project.id == id, Project.user_id == str(user.id)).first()
-    if not project:
+    async def load():
+        row = (await db.execute(
+            select(Project, ProjectSummary)
+            .outerjoin(ProjectSummary, ProjectSummary.project_id == Project.id)
+            .where(Project.id == id, Project.user_id == str(user.id))
+            .options(selectinload(Project.tasks), selectinload(Project.milestones))
+        )).first()
+        if not row:
+            return None
+        project = row.Project
+        # Tasks and milestones are loaded (one selectin query each) only because the page lists them;
+        # the totals come from the summary row
+        summary = (await rollups.fresh(db, {project.id: row.ProjectSummary}))[project.id]
+
+        return {
+            "project": dict(
+                cache.as_dict(project),
+                tasks=[cache.as_dict(t) for t in project.tasks],
+                milestones=[cache.as_dict(m) for m in project.milestones]
+            ),
+            "summary": cache.as_dict(summary),
+            "progress": aggregates.progress_percent(summary.total_tasks, summary.tasks_done),
+            "total_hours_est": summary.estimated_hours,
+            "total_hours_act": summary.actual_hours
+        }
+
+    data = await cache.cached(str(user.id), f"project:{id}", load)
+    if not data:
         raise HTTPException(status_code=404, detail="Project not found")
-        
-    total_tasks = len(project.tasks)
-    done_tasks = len([t for t in project.tasks if t.status == "done"])
-    progress = 0
-    if total_tasks > 0:
-        progress = int((done_tasks / total_tasks) * 100)
     
-    total_hours_est = sum([t.estimated_hours for t in project.tasks if t.estimated_hours])
-    total_hours_act = sum([t.actual_hours for t in project.tasks if t.actual_hours])
-    
-    return templates.TemplateResponse("projects/detail.html", {
-        "request": request, 
-        "user": user, 
-        "project": project,
-        "progress": progress,
-        "total_hours_est": total_hours_est,
-        "total_hours_act": total_hours_act
-    })
+    return templates.TemplateResponse("projects/detail.html", dict(data, request=request, user=user))
 
 @router.get("/projects/{id}/edit", response_class=HTMLResponse)
 async def edit_project_form(
     request: Request,
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
     _ : Any = Depends(get_active_subscription)
 ):
-    project = db.query(Project).filter(Project.id == id, Project.user_id == str(user.id)).first()
+    project = (await db.execute(select(Project).where(Project.id == id, Project.user_id == str(user.id)))).scalars().first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     return templates.TemplateResponse("projects/form.html", {"request": request, "user": user, "project": project})
@@ -147,11 +170,11 @@ async def update_project(
     start_date: str = Form(None),
     due_date: str = Form(None),
     budget: float = Form(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
     _ : Any = Depends(get_active_subscription)
 ):
-    project = db.query(Project).filter(Project.id == id, Project.user_id == str(user.id)).first()
+    project = (await db.execute(select(Project).where(Project.id == id, Project.user_id == str(user.id)))).scalars().first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
         
@@ -167,21 +190,23 @@ async def update_project(
     else:
         project.budget = None
     
-    db.commit()
+    await db.commit()
+    await cache.invalidate_tenant(str(user.id))
     return RedirectResponse(url=f"/projects/{id}", status_code=fastapi_status.HTTP_303_SEE_OTHER)
 
 @router.post("/projects/{id}/delete")
 async def delete_project(
     request: Request,
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
     _ : Any = Depends(get_active_subscription)
 ):
-    project = db.query(Project).filter(Project.id == id, Project.user_id == str(user.id)).first()
+    project = (await db.execute(select(Project).where(Project.id == id, Project.user_id == str(user.id)))).scalars().first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    db.delete(project)
-    db.commit()
+    await db.delete(project)
+    await db.commit()
+    await cache.invalidate_tenant(str(user.id))
     return RedirectResponse(url="/projects", status_code=fastapi_status.HTTP_303_SEE_OTHER)
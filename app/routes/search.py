@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, Request, Query
+from fastapi.responses import HTMLResponse, JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List
+
+from app.database import get_async_db
+from app.routes import get_current_user, get_active_subscription, check_etag
+from app import pagination, search
+from app.templating import templates
+
+router = APIRouter()
+
+SEARCH_PAGE_SIZE = 20
+
+def search_item(row) -> dict:
+    return {
+        "kind": row.kind,
+        "id": row.ref_id,
+        "project_id": row.project_id,
+        "task_id": row.task_id,
+        "title": row.title,
+        "snippet": row.snippet,
+        "url": search.url_for(row)
+    }
+
+@router.get("/search", response_class=HTMLResponse)
+async def search_page(
+    request: Request,
+    q: str = "",
+    kind: str = None,
+    cursor: str = None,
+    db: AsyncSession = Depends(get_async_db),
+    user: Any = Depends(get_current_user),
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
+):
+    results, next_cursor = await search.search(db, str(user.id), q, [kind] if kind else None, SEARCH_PAGE_SIZE, cursor)
+    return templates.TemplateResponse("search.html", {
+        "request": request,
+        "user": user,
+        "q": q,
+        "kind": kind,
+        "kinds": search.KINDS,
+        "results": [search_item(r) for r in results],
+        "next_cursor": next_cursor
+    })
+
+@router.get("/api/search")
+async def api_search(
+    q: str,
+    kind: List[str] = Query(None),
+    cursor: str = None,
+    limit: int = pagination.DEFAULT_LIMIT,
+    db: AsyncSession = Depends(get_async_db),
+    user: Any = Depends(get_current_user),
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
+):
+    # Ranked, tenant-scoped matches over project, task, time entry and insight text
+    results, next_cursor = await search.search(db, str(user.id), q, kind, limit, cursor)
+    return JSONResponse(content={
+        "items": [search_item(r) for r in results],
+        "next_cursor": next_cursor
+    })
@@ -1,65 +1,465 @@
 from fastapi import APIRouter, Depends, Request, Form, HTTPException, status as fastapi_status, Body
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, contains_eager
+from sqlalchemy import select, desc, func, insert, update, bindparam
 from typing import Any, List
 from datetime import date, datetime
 from pydantic import BaseModel
 
-from app.database import get_db
+from app.database import get_async_db, session_factory
 from app.models import Project, Task, TimeEntry
-from app.routes import get_current_user, get_active_subscription
+from app.routes import get_current_user, get_active_subscription, check_etag
+from app import pagination, cache, events, exports, rollups
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 class TaskMove(BaseModel):
     status: str
 
+BOARD_STATUSES = ["todo", "in_progress", "review", "done", "blocked"]
+# Cards rendered per column on first load; the rest are fetched from /api/tasks on demand
+BOARD_PAGE_SIZE = 50
+# Limits for POST /api/time-entries/bulk
+MAX_BULK_ENTRIES = 1000
+MAX_HOURS_PER_ENTRY = 24
+# Limits / fields for POST /api/tasks/batch
+TASK_PRIORITIES = ["low", "medium", "high", "critical"]
+MAX_BATCH_OPERATIONS = 500
+EDITABLE_TASK_FIELDS = ["title", "description", "status", "priority", "assigned_to", "due_date", "estimated_hours"]
+
+def task_filters(user_id: str, status: str = None, priority: str = None, assigned_to: str = None,
+                 project_id: int = None, due_from: date = None, due_to: date = None) -> list:
+    # Tenant scope plus the optional board / API filters, as WHERE clauses on Task joined to Project
+    clauses = [Project.user_id == user_id]
+    if status:
+        clauses.append(Task.status == status)
+    if priority:
+        clauses.append(Task.priority == priority)
+    if assigned_to:
+        clauses.append(Task.assigned_to == assigned_to)
+    if project_id:
+        clauses.append(Task.project_id == project_id)
+    if due_from:
+        clauses.append(Task.due_date >= due_from)
+    if due_to:
+        clauses.append(Task.due_date <= due_to)
+    return clauses
+
+def task_to_json(task: Task) -> dict:
+    return {
+        "id": task.id,
+        "project_id": task.project_id,
+        "project_name": task.project.name if task.project else None,
+        "title": task.title,
+        "status": task.status,
+        "priority": task.priority,
+        "assigned_to": task.assigned_to,
+        "due_date": task.due_date.isoformat() if task.due_date else None,
+        "estimated_hours": task.estimated_hours,
+        "actual_hours": task.actual_hours
+    }
+
 @router.get("/tasks", response_class=HTMLResponse)
 async def tasks_board(
     request: Request,
-    db: Session = Depends(get_db),
+    project_id: int = None,
+    priority: str = None,
+    assigned_to: str = None,
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
-    _ : Any = Depends(get_active_subscription)
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
 ):
-    projects = db.query(Project).filter(Project.user_id == str(user.id)).all()
+    projects = (await db.execute(select(Project).where(Project.user_id == str(user.id)))).scalars().all()
     project_ids = [p.id for p in projects]
-    
-    tasks = []
+    filters = task_filters(str(user.id), priority=priority, assigned_to=assigned_to, project_id=project_id)
+
+    task_counts = {s: 0 for s in BOARD_STATUSES}
+    tasks_by_status = {s: [] for s in BOARD_STATUSES}
+    next_cursors = {s: None for s in BOARD_STATUSES}
+
     if project_ids:
-        tasks = db.query(Task).filter(Task.project_id.in_(project_ids)).all()
-        
-    tasks_by_status = {
-        "todo": [],
-        "in_progress": [],
-        "review": [],
-        "done": [],
-        "blocked": []
-    }
-    
-    for t in tasks:
-        if t.status in tasks_by_status:
-            tasks_by_status[t.status].append(t)
+        counts = await db.execute(
+            select(Task.status, func.count(Task.id)).join(Task.project).where(*filters).group_by(Task.status)
+        )
+        for status, count in counts.all():
+            if status in task_counts:
+                task_counts[status] = count
+
+        # First page of every column in one statement; the project is joined so
+        # cards can show its name without a lazy load
+        ranked = (
+            select(Task.id, func.row_number().over(partition_by=Task.status, order_by=Task.id).label("rn"))
+            .join(Task.project).where(*filters).subquery()
+        )
+        tasks = (await db.execute(
+            select(Task).join(ranked, ranked.c.id == Task.id).join(Task.project)
+            .where(ranked.c.rn <= BOARD_PAGE_SIZE)
+            .options(contains_eager(Task.project))
+            .order_by(Task.id)
+        )).scalars().all()
+
+        for t in tasks:
+            if t.status in tasks_by_status:
+                tasks_by_status[t.status].append(t)
+        for status, column in tasks_by_status.items():
+            if task_counts[status] > len(column):
+                next_cursors[status] = pagination.encode_cursor(column[-1].id)
             
     return templates.TemplateResponse("tasks/board.html", {
         "request": request,
         "user": user,
         "tasks_by_status": tasks_by_status,
-        "projects": projects
+        "task_counts": task_counts,
+        "next_cursors": next_cursors,
+        "page_size": BOARD_PAGE_SIZE,
+        "filters": {"project_id": project_id, "priority": priority, "assigned_to": assigned_to},
+        "projects": projects,
+        "project_names": {p.id: p.name for p in projects}
     })
 
+@router.get("/api/tasks")
+async def api_list_tasks(
+    status: str = None,
+    priority: str = None,
+    assigned_to: str = None,
+    project_id: int = None,
+    due_from: str = None,
+    due_to: str = None,
+    cursor: str = None,
+    limit: int = pagination.DEFAULT_LIMIT,
+    db: AsyncSession = Depends(get_async_db),
+    user: Any = Depends(get_current_user),
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
+):
+    limit = pagination.clamp_limit(limit)
+    filters = task_filters(
+        str(user.id), status=status, priority=priority, assigned_to=assigned_to, project_id=project_id,
+        due_from=pagination.parse_date(due_from, "due_from"), due_to=pagination.parse_date(due_to, "due_to")
+    )
+    if cursor:
+        (after_id,) = pagination.decode_cursor(cursor, int)
+        filters.append(pagination.after([Task.id], [after_id]))
+
+    rows = (await db.execute(
+        select(Task).join(Task.project).where(*filters)
+        .options(contains_eager(Task.project))
+        .order_by(Task.id).limit(limit + 1)
+    )).scalars().all()
+    tasks, next_cursor = pagination.page(rows, limit, lambda t: pagination.encode_cursor(t.id))
+
+    return JSONResponse(content={"items": [task_to_json(t) for t in tasks], "next_cursor": next_cursor})
+
+def export_response(request: Request, queries, columns: dict, format: str, name: str) -> StreamingResponse:
+    # Streamed download of every matching row (see app/exports.py)
+    if format not in exports.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(exports.FORMATS)}")
+    if exports.busy():
+        raise HTTPException(status_code=429, detail="Too many exports in progress", headers={"Retry-After": "10"})
+    return StreamingResponse(
+        exports.stream(session_factory(request), queries, columns, format),
+        media_type=exports.FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}-{date.today().isoformat()}.{format}"',
+            "Cache-Control": "private, no-store",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@router.get("/api/tasks/export")
+async def export_tasks(
+    request: Request,
+    format: str = "csv",
+    status: str = None,
+    priority: str = None,
+    assigned_to: str = None,
+    project_id: int = None,
+    due_from: str = None,
+    due_to: str = None,
+    user: Any = Depends(get_current_user),
+    _ : Any = Depends(get_active_subscription)
+):
+    # All of the tenant's matching tasks as CSV / NDJSON, same filters as /api/tasks
+    filters = task_filters(
+        str(user.id), status=status, priority=priority, assigned_to=assigned_to, project_id=project_id,
+        due_from=pagination.parse_date(due_from, "due_from"), due_to=pagination.parse_date(due_to, "due_to")
+    )
+    queries = exports.task_queries(str(user.id), filters, project_id=project_id)
+    return export_response(request, queries, exports.TASK_COLUMNS, format, "tasks")
+
+def parse_task_fields(row: dict, required: tuple = ()) -> dict:
+    # Editable Task fields from one batch operation; raises ValueError with the reason
+    fields = {}
+    for name in required:
+        if row.get(name) in (None, ""):
+            raise ValueError(f"{name} is required")
+    for name in EDITABLE_TASK_FIELDS:
+        if name not in row:
+            continue
+        value = row[name]
+        if name == "title":
+            if not isinstance(value, str) or not value.strip() or len(value) > 200:
+                raise ValueError("title must be 1-200 characters")
+        elif name == "status":
+            if value not in BOARD_STATUSES:
+                raise ValueError(f"status must be one of {', '.join(BOARD_STATUSES)}")
+        elif name == "priority":
+            if value not in TASK_PRIORITIES:
+                raise ValueError(f"priority must be one of {', '.join(TASK_PRIORITIES)}")
+        elif name == "due_date":
+            if value is not None:
+                try:
+                    value = datetime.strptime(value, "%Y-%m-%d").date()
+                except (TypeError, ValueError):
+                    raise ValueError("due_date must be YYYY-MM-DD")
+        elif name == "estimated_hours":
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0):
+                raise ValueError("estimated_hours must be a non-negative number")
+        elif value is not None and not isinstance(value, str):
+            raise ValueError(f"{name} must be a string")
+        fields[name] = value
+    return fields
+
+@router.post("/api/tasks/batch")
+async def batch_tasks(
+    payload: dict = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+    user: Any = Depends(get_current_user),
+    _ : Any = Depends(get_active_subscription)
+):
+    # Many board edits in one request and one transaction:
+    #   {"moves": [{"id", "status"}], "updates": [{"id", <fields>}], "creates": [{"project_id", "title", <fields>}]}
+    # All or nothing: any invalid operation or unknown id rejects the whole batch.
+    moves = payload.get("moves") or []
+    updates = payload.get("updates") or []
+    creates = payload.get("creates") or []
+    if not all(isinstance(ops, list) for ops in (moves, updates, creates)):
+        return JSONResponse(status_code=400, content={"error": "moves, updates and creates must be lists"})
+    if len(moves) + len(updates) + len(creates) > MAX_BATCH_OPERATIONS:
+        return JSONResponse(status_code=400, content={"error": f"At most {MAX_BATCH_OPERATIONS} operations per request"})
+
+    edits, new_tasks, errors = [], [], []
+    for kind, ops in (("moves", moves), ("updates", updates)):
+        for index, op in enumerate(ops):
+            try:
+                if not isinstance(op, dict) or not isinstance(op.get("id"), int):
+                    raise ValueError("id is required")
+                fields = parse_task_fields({"status": op.get("status")} if kind == "moves" else op,
+                                           required=("status",) if kind == "moves" else ())
+                edits.append((op["id"], fields))
+            except ValueError as e:
+                errors.append({"op": kind, "index": index, "error": str(e)})
+    for index, op in enumerate(creates):
+        try:
+            if not isinstance(op, dict) or not isinstance(op.get("project_id"), int):
+                raise ValueError("project_id is required")
+            new_tasks.append((op["project_id"], parse_task_fields(op, required=("title",))))
+        except ValueError as e:
+            errors.append({"op": "creates", "index": index, "error": str(e)})
+    if errors:
+        return JSONResponse(status_code=400, content={"error": "Invalid operations", "errors": errors})
+
+    # One ownership check over every task id, one over every target project
+    task_ids = {task_id for task_id, _fields in edits}
+    tasks = {t.id: t for t in (await db.execute(
+        select(Task).join(Project).where(Task.id.in_(task_ids), Project.user_id == str(user.id))
+    )).scalars()} if task_ids else {}
+    project_ids = {project_id for project_id, _fields in new_tasks}
+    owned_projects = set((await db.execute(
+        select(Project.id).where(Project.id.in_(project_ids), Project.user_id == str(user.id))
+    )).scalars()) if project_ids else set()
+
+    missing = sorted(task_ids - tasks.keys())
+    missing_projects = sorted(project_ids - owned_projects)
+    if missing or missing_projects:
+        return JSONResponse(status_code=404, content={
+            "error": "Not found", "task_ids": missing, "project_ids": missing_projects
+        })
+
+    # Later operations on the same task win, so queued moves coalesce naturally
+    changed = {task_id: {} for task_id in task_ids}
+    for task_id, fields in edits:
+        task = tasks[task_id]
+        for name, value in fields.items():
+            if getattr(task, name) != value:
+                changed[task_id].setdefault(name, getattr(task, name))
+            setattr(task, name, value)
+    created = [Task(project_id=project_id, **dict({"status": "todo"}, **fields)) for project_id, fields in new_tasks]
+    db.add_all(created)
+
+    touched = {t.project_id for t in tasks.values()} | project_ids
+    await rollups.refresh(db, touched)
+    await db.commit()
+    await cache.invalidate_tenant(str(user.id))
+    await events.publish(str(user.id), [
+        events.task_delta("task.updated", tasks[task_id], changed[task_id]) for task_id in sorted(task_ids) if changed[task_id]
+    ] + [events.task_delta("task.created", t) for t in created])
+
+    return JSONResponse(content={"updated": sorted(task_ids), "created": [t.id for t in created]})
+
+@router.get("/api/time-entries")
+async def api_list_time_entries(
+    project_id: int = None,
+    task_id: int = None,
+    date_from: str = None,
+    date_to: str = None,
+    cursor: str = None,
+    limit: int = pagination.DEFAULT_LIMIT,
+    db: AsyncSession = Depends(get_async_db),
+    user: Any = Depends(get_current_user),
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
+):
+    # The user's own time entries, newest day first
+    limit = pagination.clamp_limit(limit)
+    filters = [TimeEntry.user_id == str(user.id)]
+    if task_id:
+        filters.append(TimeEntry.task_id == task_id)
+    if project_id:
+        filters.append(Task.project_id == project_id)
+    d_from = pagination.parse_date(date_from, "date_from")
+    d_to = pagination.parse_date(date_to, "date_to")
+    if d_from:
+        filters.append(TimeEntry.date >= d_from)
+    if d_to:
+        filters.append(TimeEntry.date <= d_to)
+    if cursor:
+        after_date, after_id = pagination.decode_cursor(cursor, date.fromisoformat, int)
+        filters.append(pagination.after([TimeEntry.date, TimeEntry.id], [after_date, after_id], descending=True))
+
+    rows = (await db.execute(
+        select(TimeEntry, Task.project_id).join(Task, Task.id == TimeEntry.task_id).where(*filters)
+        .order_by(desc(TimeEntry.date), desc(TimeEntry.id)).limit(limit + 1)
+    )).all()
+    rows, next_cursor = pagination.page(rows, limit, lambda r: pagination.encode_cursor(r.TimeEntry.date, r.TimeEntry.id))
+
+    return JSONResponse(content={
+        "items": [{
+            "id": entry.id,
+            "task_id": entry.task_id,
+            "project_id": entry_project_id,
+            "hours": entry.hours,
+            "description": entry.description,
+            "date": entry.date.isoformat()
+        } for entry, entry_project_id in rows],
+        "next_cursor": next_cursor
+    })
+
+@router.get("/api/time-entries/export")
+async def export_time_entries(
+    request: Request,
+    format: str = "csv",
+    project_id: int = None,
+    task_id: int = None,
+    date_from: str = None,
+    date_to: str = None,
+    user: Any = Depends(get_current_user),
+    _ : Any = Depends(get_active_subscription)
+):
+    # The user's time entries as CSV / NDJSON, oldest day first, for billing
+    queries = exports.time_entry_queries(
+        str(user.id), project_id=project_id, task_id=task_id,
+        date_from=pagination.parse_date(date_from, "date_from"), date_to=pagination.parse_date(date_to, "date_to")
+    )
+    return export_response(request, queries, exports.TIME_ENTRY_COLUMNS, format, "time-entries")
+
+async def add_actual_hours(db: AsyncSession, hours_by_task: dict):
+    # actual_hours += hours as one UPDATE per task, evaluated by the database, so
+    # concurrent loggers cannot overwrite each other's increments
+    tasks = Task.__table__
+    await db.execute(
+        update(tasks)
+        .where(tasks.c.id == bindparam("b_task_id"))
+        .values(actual_hours=func.coalesce(tasks.c.actual_hours, 0.0) + bindparam("b_hours")),
+        [{"b_task_id": task_id, "b_hours": hours} for task_id, hours in hours_by_task.items()]
+    )
+
+def parse_time_entry(row: Any, project_of_task: dict) -> dict:
+    # One row of a bulk upload -> TimeEntry column values; raises ValueError with the reason
+    if not isinstance(row, dict):
+        raise ValueError("entry must be an object")
+    task_id = row.get("task_id")
+    if not isinstance(task_id, int) or task_id not in project_of_task:
+        raise ValueError("task not found")
+    hours = row.get("hours")
+    if isinstance(hours, bool) or not isinstance(hours, (int, float)) or not 0 < hours <= MAX_HOURS_PER_ENTRY:
+        raise ValueError(f"hours must be a number between 0 and {MAX_HOURS_PER_ENTRY}")
+    try:
+        entry_date = datetime.strptime(row.get("date") or "", "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError("date must be YYYY-MM-DD")
+    description = row.get("description")
+    if description is not None and not isinstance(description, str):
+        raise ValueError("description must be a string")
+    return {"task_id": task_id, "hours": float(hours), "description": description, "date": entry_date}
+
+@router.post("/api/time-entries/bulk")
+async def bulk_log_time(
+    payload: dict = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+    user: Any = Depends(get_current_user),
+    _ : Any = Depends(get_active_subscription)
+):
+    # Timesheet imports: {"entries": [{"task_id", "hours", "date", "description"}, ...], "atomic": false}
+    # Valid rows are inserted in one transaction; invalid ones are reported by index.
+    # With "atomic": true nothing is inserted unless every row is valid.
+    rows = payload.get("entries")
+    if not isinstance(rows, list) or not rows:
+        return JSONResponse(status_code=400, content={"error": "entries must be a non-empty list"})
+    if len(rows) > MAX_BULK_ENTRIES:
+        return JSONResponse(status_code=400, content={"error": f"At most {MAX_BULK_ENTRIES} entries per request"})
+
+    # One query resolves every referenced task to its project (and drops other tenants' tasks)
+    task_ids = {row.get("task_id") for row in rows if isinstance(row, dict) and isinstance(row.get("task_id"), int)}
+    project_of_task = dict((await db.execute(
+        select(Task.id, Task.project_id).join(Project).where(Task.id.in_(task_ids), Project.user_id == str(user.id))
+    )).all()) if task_ids else {}
+
+    entries, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            entries.append(dict(parse_time_entry(row, project_of_task), user_id=str(user.id)))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+
+    if errors and payload.get("atomic"):
+        return JSONResponse(status_code=400, content={"error": "Invalid entries", "inserted": 0, "errors": errors})
+
+    if entries:
+        hours_by_task, hours_by_day = {}, {}
+        for entry in entries:
+            hours_by_task[entry["task_id"]] = hours_by_task.get(entry["task_id"], 0.0) + entry["hours"]
+            day = (entry["task_id"], entry["date"])
+            hours_by_day[day] = hours_by_day.get(day, 0.0) + entry["hours"]
+        await db.execute(insert(TimeEntry.__table__), entries)
+        await add_actual_hours(db, hours_by_task)
+        await rollups.refresh(db, {project_of_task[task_id] for task_id in hours_by_task})
+        await db.commit()
+        await cache.invalidate_tenant(str(user.id))
+        await events.publish(str(user.id), [
+            events.time_delta(task_id, project_of_task[task_id], hours, day) for (task_id, day), hours in hours_by_day.items()
+        ])
+
+    return JSONResponse(content={"inserted": len(entries), "errors": errors})
+
 @router.get("/tasks/{id}", response_class=HTMLResponse)
 async def task_detail(
     request: Request,
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
-    _ : Any = Depends(get_active_subscription)
+    _ : Any = Depends(get_active_subscription),
+    _etag: Any = Depends(check_etag)
 ):
     # Join with Project to ensure user owns the project
-    task = db.query(Task).join(Project).filter(Task.id == id, Project.user_id == str(user.id)).first()
+    task = (await db.execute(
+        select(Task).join(Project)
+        .where(Task.id == id, Project.user_id == str(user.id))
+        .options(selectinload(Task.time_entries))
+    )).scalars().first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
         
@@ -79,11 +479,11 @@ async def create_task(
     assigned_to: str = Form(None),
     due_date: str = Form(None),
     estimated_hours: float = Form(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
     _ : Any = Depends(get_active_subscription)
 ):
-    project = db.query(Project).filter(Project.id == project_id, Project.user_id == str(user.id)).first()
+    project = (await db.execute(select(Project).where(Project.id == project_id, Project.user_id == str(user.id)))).scalars().first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
         
@@ -100,8 +500,11 @@ async def create_task(
         status="todo"
     )
     db.add(new_task)
-    db.commit()
-    db.refresh(new_task)
+    await rollups.refresh(db, [project_id])
+    await db.commit()
+    await db.refresh(new_task)
+    await cache.invalidate_tenant(str(user.id))
+    await events.publish(str(user.id), [events.task_delta("task.created", new_task)])
     
     return RedirectResponse(url=f"/projects/{project_id}", status_code=fastapi_status.HTTP_303_SEE_OTHER)
 
@@ -109,7 +512,7 @@ async def create_task(
 async def move_task(
     id: int,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
     _ : Any = Depends(get_active_subscription)
 ):
@@ -125,12 +528,17 @@ async def move_task(
     if not new_status:
         raise HTTPException(status_code=400, detail="Missing status")
 
-    task = db.query(Task).join(Project).filter(Task.id == id, Project.user_id == str(user.id)).first()
+    task = (await db.execute(select(Task).join(Project).where(Task.id == id, Project.user_id == str(user.id)))).scalars().first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
         
+    previous_status = task.status
     task.status = new_status
-    db.commit()
+    await rollups.refresh(db, [task.project_id])
+    await db.commit()
+    await cache.invalidate_tenant(str(user.id))
+    if new_status != previous_status:
+        await events.publish(str(user.id), [events.task_delta("task.updated", task, {"status": previous_status})])
     
     return JSONResponse(content={"status": "ok", "new_status": task.status})
 
@@ -141,12 +549,14 @@ async def log_time(
     hours: float = Form(...),
     description: str = Form(None),
     date_logged: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: Any = Depends(get_current_user),
     _ : Any = Depends(get_active_subscription)
 ):
-    task = db.query(Task).join(Project).filter(Task.id == id, Project.user_id == str(user.id)).first()
-    if not task:
+    project_id = (await db.execute(
+        select(Task.project_id).join(Project).where(Task.id == id, Project.user_id == str(user.id))
+    )).scalar()
+    if not project_id:
         raise HTTPException(status_code=404, detail="Task not found")
         
     l_date = datetime.strptime(date_logged, "%Y-%m-%d").date()
@@ -161,10 +571,11 @@ async def log_time(
     db.add(entry)
     
     # Update actual hours on task
-    if task.actual_hours is None:
-        task.actual_hours = 0.0
-    task.actual_hours += hours
+    await add_actual_hours(db, {id: hours})
     
-    db.commit()
+    await rollups.refresh(db, [project_id])
+    await db.commit()
+    await cache.invalidate_tenant(str(user.id))
+    await events.publish(str(user.id), [events.time_delta(id, project_id, hours, l_date)])
     
     return RedirectResponse(url=f"/tasks/{id}", status_code=fastapi_status.HTTP_303_SEE_OTHER)
@@ -0,0 +1,259 @@
+# Full-text search over projects, tasks, time entries and insights.
+#
+# One inverted index per database, picked by the engine in app/database.py:
+#   - SQLite: an FTS5 table, search_index, with the porter stemmer (Postgres
+#     stems through its english configuration). Each document carries a
+#     tenant token ('t' || hex(user_id) || '0') in its own column, and every
+#     query ANDs it in, so FTS5 intersects posting lists instead of filtering
+#     another tenant's matches row by row. The token ends in a digit because
+#     the stemmer only rewrites letter suffixes: without it, tenants 1AED and
+#     1A would both be indexed as t1a.
+#   - Postgres: search_documents with a generated tsvector (title weight A,
+#     body weight B) under a GIN index, plus user_id.
+# Results rank title matches above body matches, newest first (see search()).
+#
+# The index is maintained by triggers on the source tables, installed by the
+# search_index migration. That covers every write path (ORM flushes, the Core
+# bulk inserts in app/seed.py and the time-entry import, cascade deletes)
+# without any call in the routes. A document's id is
+# ref_id * len(KINDS) + code, so each trigger touches its own row by primary key.
+#
+# Drift repair (e.g. after restoring a table): python -m app.search
+import logging
+import re
+
+from sqlalchemy import text
+
+from app import pagination
+from app.database import BACKEND
+
+logger = logging.getLogger(__name__)
+
+POSTGRES_CONFIG = "english"  # text search configuration baked into the generated column
+MAX_TERMS = 8
+SNIPPET_WORDS = 16
+
+# kind -> how to build its document from a row aliased {r}. Tasks and insights
+# get their tenant from the project, joined as p.
+SOURCES = {
+    "project": dict(
+        code=0, table="projects", watch=("name", "description"), join=None,
+        user="{r}.user_id", project="{r}.id", task="NULL", title="{r}.name", body="{r}.description",
+    ),
+    "task": dict(
+        code=1, table="tasks", watch=("title", "description", "project_id"), join="{r}.project_id",
+        user="p.user_id", project="{r}.project_id", task="{r}.id", title="{r}.title", body="{r}.description",
+    ),
+    "time_entry": dict(
+        code=2, table="time_entries", watch=("description", "task_id"), join=None,
+        user="{r}.user_id", project="NULL", task="{r}.task_id", title="''", body="{r}.description",
+    ),
+    "insight": dict(
+        code=3, table="project_insights", watch=("insight_type", "content"), join="{r}.project_id",
+        user="p.user_id", project="{r}.project_id", task="NULL", title="{r}.insight_type", body="{r}.content",
+    ),
+}
+KINDS = list(SOURCES)
+
+
+def _select(kind: str, r: str, for_trigger: bool) -> str:
+    # SELECT producing the index row(s) for row alias r
+    source = SOURCES[kind]
+    user = source["user"].format(r=r)
+    tenant = f"'t' || hex({user}) || '0'" if BACKEND == "sqlite" else user
+    columns = ", ".join([
+        f"{r}.id * {len(KINDS)} + {source['code']}", tenant,
+        f"coalesce({source['title'].format(r=r)}, '')", f"coalesce({source['body'].format(r=r)}, '')",
+        f"'{kind}'", f"{r}.id", source["project"].format(r=r), source["task"].format(r=r),
+    ])
+    if for_trigger:
+        sql = f"SELECT {columns}"
+        if source["join"]:
+            sql += f" FROM projects p WHERE p.id = {source['join'].format(r=r)}"
+        return sql
+    sql = f"SELECT {columns} FROM {source['table']} {r}"
+    if source["join"]:
+        sql += f" JOIN projects p ON p.id = {source['join'].format(r=r)}"
+    return sql
+
+
+def _sqlite_ddl() -> list:
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "tenant, title, body, kind UNINDEXED, ref_id UNINDEXED, project_id UNINDEXED, task_id UNINDEXED, "
+        "prefix='2 3', tokenize='porter unicode61 remove_diacritics 2')"
+    ]
+    insert = "INSERT INTO search_index (rowid, tenant, title, body, kind, ref_id, project_id, task_id) "
+    for kind, source in SOURCES.items():
+        table, doc_id = source["table"], f"{{r}}.id * {len(KINDS)} + {source['code']}"
+        delete = f"DELETE FROM search_index WHERE rowid = {doc_id.format(r='old')};"
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_insert AFTER INSERT ON {table} BEGIN "
+            f"{insert}{_select(kind, 'new', True)}; END",
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_update AFTER UPDATE OF {', '.join(source['watch'])} ON {table} BEGIN "
+            f"{delete} {insert}{_select(kind, 'new', True)}; END",
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_delete AFTER DELETE ON {table} BEGIN {delete} END",
+        ]
+    return statements
+
+
+def _postgres_ddl() -> list:
+    statements = [
+        "CREATE TABLE IF NOT EXISTS search_documents ("
+        "id BIGINT PRIMARY KEY, user_id VARCHAR NOT NULL, title TEXT NOT NULL, body TEXT NOT NULL, "
+        "kind VARCHAR(16) NOT NULL, ref_id INTEGER NOT NULL, project_id INTEGER, task_id INTEGER, "
+        f"document TSVECTOR GENERATED ALWAYS AS (setweight(to_tsvector('{POSTGRES_CONFIG}', title), 'A') || "
+        f"setweight(to_tsvector('{POSTGRES_CONFIG}', body), 'B')) STORED)",
+        "CREATE INDEX IF NOT EXISTS ix_search_documents_document ON search_documents USING GIN (document)",
+        "CREATE INDEX IF NOT EXISTS ix_search_documents_user_id ON search_documents (user_id)",
+    ]
+    insert = "INSERT INTO search_documents (id, user_id, title, body, kind, ref_id, project_id, task_id) "
+    for kind, source in SOURCES.items():
+        table, doc_id = source["table"], f"OLD.id * {len(KINDS)} + {source['code']}"
+        statements += [
+            f"CREATE OR REPLACE FUNCTION search_index_{table}() RETURNS trigger AS $$ BEGIN "
+            f"IF TG_OP IN ('UPDATE', 'DELETE') THEN DELETE FROM search_documents WHERE id = {doc_id}; END IF; "
+            f"IF TG_OP IN ('INSERT', 'UPDATE') THEN {insert}{_select(kind, 'NEW', True)}; END IF; "
+            "RETURN NULL; END $$ LANGUAGE plpgsql",
+            f"DROP TRIGGER IF EXISTS search_{table} ON {table}",
+            f"CREATE TRIGGER search_{table} AFTER INSERT OR DELETE OR UPDATE OF {', '.join(source['watch'])} "
+            f"ON {table} FOR EACH ROW EXECUTE FUNCTION search_index_{table}()",
+        ]
+    return statements
+
+
+def _index_table() -> str:
+    return "search_index" if BACKEND == "sqlite" else "search_documents"
+
+
+def install(conn):
+    # Index structure + triggers (idempotent), then a full backfill
+    for statement in _sqlite_ddl() if BACKEND == "sqlite" else _postgres_ddl():
+        conn.execute(text(statement))
+    rebuild(conn)
+
+
+def reinstall(conn):
+    # Drop the SQLite index and its triggers and build them again: FTS5 cannot
+    # change the tokenizer of an existing table
+    for source in SOURCES.values():
+        for event in ("insert", "update", "delete"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS search_{source['table']}_{event}"))
+    conn.execute(text("DROP TABLE IF EXISTS search_index"))
+    install(conn)
+
+
+def rebuild(conn) -> int:
+    table = _index_table()
+    columns = "(rowid, tenant, title, body, kind, ref_id, project_id, task_id)" if BACKEND == "sqlite" \
+        else "(id, user_id, title, body, kind, ref_id, project_id, task_id)"
+    conn.execute(text(f"DELETE FROM {table}"))
+    for kind in KINDS:
+        conn.execute(text(f"INSERT INTO {table} {columns} {_select(kind, 'r', False)}"))
+    return conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+def terms(query: str) -> list:
+    # Words only: index syntax (quotes, operators, column filters) never reaches the engine
+    return re.findall(r"\w+", (query or "").lower())[:MAX_TERMS]
+
+
+def _match(words: list, columns: str = None) -> str:
+    # Every word must match; the last one as a prefix so results update while
+    # typing. columns="title" restricts the match to titles (Postgres: weight A).
+    if BACKEND == "sqlite":
+        phrases = [f'"{w}"' for w in words]
+        if len(words[-1]) >= 2:
+            phrases[-1] += "*"
+        return "{" + (columns or "title body") + "} : (" + " AND ".join(phrases) + ")"
+    weight = "A" if columns == "title" else ""
+    parts = [f"{w}:{weight}" if weight else w for w in words]
+    if len(words[-1]) >= 2:
+        parts[-1] = f"{words[-1]}:*{weight}"
+    return " & ".join(parts)
+
+
+def url_for(row) -> str:
+    if row.kind == "project":
+        return f"/projects/{row.ref_id}"
+    if row.kind == "insight":
+        return f"/insights/{row.ref_id}"
+    return f"/tasks/{row.task_id}"
+
+
+def _tier(value) -> int:
+    # Cursor tier: 0 (title matches) or 1 (body-only matches)
+    if value not in (0, 1):
+        raise ValueError("unknown tier")
+    return int(value)
+
+
+def _sqlite_tier(tier: int, filters: str) -> str:
+    return (
+        f"SELECT * FROM (SELECT {tier} AS tier, rowid AS doc_id, kind, ref_id, project_id, task_id, title, "
+        f"snippet(search_index, 2, '', '', '…', {SNIPPET_WORDS}) AS snippet "
+        f"FROM search_index WHERE search_index MATCH :match{tier}{filters} ORDER BY rowid DESC LIMIT :limit)"
+    )
+
+
+async def search(db, user_id: str, query: str, kinds: list = None, limit: int = pagination.DEFAULT_LIMIT, cursor: str = None):
+    # Title matches first, then body-only matches; newest first within each.
+    # (bm25 / ts_rank_cd need per-term document counts over the whole tenant,
+    # a fixed cost of several ms per query on 10^5-row tenants; these two tiers
+    # are read straight off the index in document order.)
+    # Keyset paginated on (tier, document id).
+    words = terms(query)
+    if not words:
+        return [], None
+    limit = pagination.clamp_limit(limit)
+    params = {"limit": limit + 1}
+    kinds = [k for k in (kinds or []) if k in SOURCES]
+    after_tier, after_id = pagination.decode_cursor(cursor, _tier, int) if cursor else (0, None)
+
+    filters = ""
+    if kinds:
+        filters += " AND kind IN (" + ", ".join(f":kind{i}" for i in range(len(kinds))) + ")"
+        params.update({f"kind{i}": kind for i, kind in enumerate(kinds)})
+
+    if BACKEND == "sqlite":
+        tenant = f'tenant : "t{str(user_id).encode("utf-8").hex().upper()}0" AND '
+        params.update(
+            match0=tenant + _match(words, "title"),
+            match1=tenant + f"({_match(words)} NOT {_match(words, 'title')})"
+        )
+        parts = []
+        for tier in (0, 1):
+            if tier < after_tier:
+                continue
+            tier_filters = filters
+            if after_id is not None and tier == after_tier:
+                tier_filters += " AND rowid < :after_id"
+                params["after_id"] = after_id
+            parts.append(_sqlite_tier(tier, tier_filters))
+        sql = " UNION ALL ".join(parts) + " ORDER BY tier, doc_id DESC LIMIT :limit"
+    else:
+        sql = (
+            "SELECT doc_id, tier, kind, ref_id, project_id, task_id, title, "
+            f"ts_headline('{POSTGRES_CONFIG}', body, to_tsquery('{POSTGRES_CONFIG}', :match), "
+            f"'StartSel=\"\", StopSel=\"\", MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}') AS snippet "
+            "FROM (SELECT id AS doc_id, kind, ref_id, project_id, task_id, title, body, "
+            f"CASE WHEN document @@ to_tsquery('{POSTGRES_CONFIG}', :title_match) THEN 0 ELSE 1 END AS tier "
+            f"FROM search_documents WHERE user_id = :user_id AND document @@ to_tsquery('{POSTGRES_CONFIG}', :match)"
+            f"{filters}) matches"
+        )
+        params.update(match=_match(words), title_match=_match(words, "title"), user_id=str(user_id))
+        if after_id is not None:
+            sql += " WHERE tier > :after_tier OR (tier = :after_tier AND doc_id < :after_id)"
+            params.update(after_tier=after_tier, after_id=after_id)
+        sql += " ORDER BY tier, doc_id DESC LIMIT :limit"
+
+    rows = (await db.execute(text(sql), params)).all()
+    return pagination.page(rows, limit, lambda row: pagination.encode_cursor(row.tier, row.doc_id))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from app.database import engine
+    with engine.begin() as conn:
+        count = rebuild(conn)
+    logger.info("reindexed %s search documents", count)
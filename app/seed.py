@@ -1,77 +1,219 @@
+import argparse
+import asyncio
+import contextvars
+import logging
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
+
 from app.models import Project, Task, Milestone, TimeEntry, ProjectInsight
-from datetime import datetime
+from app import rollups
+
+logger = logging.getLogger(__name__)
+
+# Sample data for a new user's workspace. Rows refer to each other by list
+# index ("project" / "task"); seed_data() and generate_tenant() resolve those
+# to ids with INSERT ... RETURNING instead of refreshing objects one by one.
+SEED_PROJECTS = [
+    dict(name="Website Redesign", description="Complete overhaul of company website with modern UI/UX.", status="active", priority="high", start_date=date(2026,1,15), due_date=date(2026,3,30), budget=45000.00),
+    dict(name="Mobile App v2", description="Second major release of the mobile application.", status="active", priority="critical", start_date=date(2026,2,1), due_date=date(2026,5,15), budget=120000.00),
+    dict(name="Data Migration", description="Migrate legacy database to new cloud infrastructure.", status="planning", priority="medium", start_date=date(2026,3,1), due_date=date(2026,4,15), budget=30000.00),
+    dict(name="API Integration Hub", description="Build centralized API gateway for third-party integrations.", status="on_hold", priority="medium", start_date=date(2026,1,10), due_date=date(2026,6,1), budget=65000.00),
+    dict(name="Q1 Marketing Campaign", description="Digital marketing campaign for Q1 product launch.", status="completed", priority="high", start_date=date(2026,1,1), due_date=date(2026,2,14), budget=25000.00),
+]
+
+SEED_TASKS = [
+    dict(project=0, title="Design wireframes", description="Create wireframes for all major pages.", status="done", priority="high", assigned_to="Design Team", due_date=date(2026,2,1), estimated_hours=40, actual_hours=35),
+    dict(project=0, title="Implement responsive layout", description="Build mobile-first responsive CSS framework.", status="in_progress", priority="high", assigned_to="Frontend Team", due_date=date(2026,2,28), estimated_hours=60, actual_hours=25),
+    dict(project=0, title="Backend API endpoints", description="Build REST API for new site features.", status="in_progress", priority="medium", assigned_to="Backend Team", due_date=date(2026,3,10), estimated_hours=80, actual_hours=30),
+    dict(project=0, title="Content migration", description="Migrate existing content to new CMS.", status="todo", priority="medium", assigned_to="Content Team", due_date=date(2026,3,15), estimated_hours=20, actual_hours=0),
+    dict(project=0, title="QA testing", description="Full regression testing before launch.", status="todo", priority="high", assigned_to="QA Team", due_date=date(2026,3,25), estimated_hours=30, actual_hours=0),
+    dict(project=1, title="User authentication revamp", description="Implement biometric login and SSO.", status="in_progress", priority="critical", assigned_to="Mobile Team", due_date=date(2026,3,1), estimated_hours=50, actual_hours=20),
+    dict(project=1, title="Offline mode", description="Enable app functionality without internet connection.", status="todo", priority="high", assigned_to="Mobile Team", due_date=date(2026,4,1), estimated_hours=100, actual_hours=0),
+    dict(project=1, title="Push notification system", description="Real-time push notifications for updates.", status="review", priority="medium", assigned_to="Backend Team", due_date=date(2026,2,20), estimated_hours=30, actual_hours=28),
+    dict(project=1, title="Performance optimization", description="Reduce app load time by 50%.", status="blocked", priority="high", assigned_to="Mobile Team", due_date=date(2026,4,15), estimated_hours=40, actual_hours=5),
+    dict(project=2, title="Schema mapping", description="Map legacy database schema to new cloud models.", status="todo", priority="high", assigned_to="Data Team", due_date=date(2026,3,10), estimated_hours=25, actual_hours=0),
+    dict(project=4, title="Social media content calendar", description="Plan and schedule all social posts.", status="done", priority="high", assigned_to="Marketing Team", due_date=date(2026,1,15), estimated_hours=15, actual_hours=12),
+    dict(project=4, title="Email campaign sequence", description="Design 5-email drip campaign.", status="done", priority="medium", assigned_to="Marketing Team", due_date=date(2026,2,1), estimated_hours=10, actual_hours=8),
+]
+
+SEED_MILESTONES = [
+    dict(project=0, title="Design Approval", description="Client signs off on final designs.", due_date=date(2026,2,10), completed=True, completed_at=datetime(2026,2,8)),
+    dict(project=0, title="Beta Launch", description="Internal beta with stakeholders.", due_date=date(2026,3,15), completed=False, completed_at=None),
+    dict(project=0, title="Go Live", description="Public launch of redesigned website.", due_date=date(2026,3,30), completed=False, completed_at=None),
+    dict(project=1, title="Alpha Release", description="Internal testing build.", due_date=date(2026,3,15), completed=False, completed_at=None),
+    dict(project=1, title="Beta Release", description="Limited public beta.", due_date=date(2026,4,15), completed=False, completed_at=None),
+    dict(project=1, title="Production Release", description="App store submission.", due_date=date(2026,5,15), completed=False, completed_at=None),
+    dict(project=4, title="Campaign Launch", description="All channels go live.", due_date=date(2026,1,20), completed=True, completed_at=datetime(2026,1,20)),
+    dict(project=4, title="Campaign Wrap", description="Final analysis and report.", due_date=date(2026,2,14), completed=True, completed_at=datetime(2026,2,14)),
+]
+
+SEED_TIME_ENTRIES = [
+    dict(task=0, hours=8, description="Initial wireframe concepts for homepage and product pages.", date=date(2026,1,20)),
+    dict(task=0, hours=6, description="Revised wireframes based on stakeholder feedback.", date=date(2026,1,22)),
+    dict(task=1, hours=10, description="Set up CSS grid system and breakpoints.", date=date(2026,2,5)),
+    dict(task=1, hours=8, description="Mobile navigation and header components.", date=date(2026,2,7)),
+    dict(task=2, hours=12, description="User and product API endpoints.", date=date(2026,2,10)),
+    dict(task=5, hours=8, description="Research biometric auth SDKs.", date=date(2026,2,8)),
+    dict(task=5, hours=12, description="Implement fingerprint and face ID login.", date=date(2026,2,12)),
+    dict(task=7, hours=15, description="Firebase push notification integration.", date=date(2026,2,14)),
+    dict(task=10, hours=6, description="Planned 4 weeks of social content.", date=date(2026,1,10)),
+    dict(task=11, hours=4, description="Wrote email copy for all 5 sequences.", date=date(2026,1,25)),
+]
+
+SEED_INSIGHTS = [
+    dict(project=0, insight_type="risk_assessment", content="RISKS: Content migration depends on legacy CMS access which has intermittent outages. Backend API is 20% behind schedule. MITIGATIONS: Start content export early. Add one more developer to API team for 2 weeks. Overall project health: AMBER — on track if mitigations are applied this week.", model_used="seed_data", requested_by="system"),
+    dict(project=1, insight_type="progress_summary", content="Mobile App v2 is 35% complete. Authentication revamp is ahead of schedule. Push notifications in review. BLOCKER: Performance optimization blocked pending new profiling tools. 3 of 4 tasks on track. Budget utilization at 28% ($33,600 of $120,000). Recommend unblocking performance task as priority.", model_used="seed_data", requested_by="system"),
+]
+
+# Rows per INSERT batch in generate_tenant()
+GENERATOR_CHUNK_SIZE = 5000
+
+
+def _insert_returning_ids(db: Session, model, rows: list, key: tuple) -> list:
+    # One batched INSERT ... RETURNING; ids are matched back to `rows` through
+    # the (unique within the batch) `key` columns, since the backend does not
+    # promise RETURNING order (asking SQLAlchemy to sort makes it one INSERT per row)
+    if not rows:
+        return []
+    returned = db.execute(insert(model).returning(model.id, *[getattr(model, k) for k in key]), rows).all()
+    id_of = {tuple(row[1:]): row[0] for row in returned}
+    return [id_of[tuple(r[k] for k in key)] for r in rows]
+
+
+def _without(row: dict, *keys) -> dict:
+    return {k: v for k, v in row.items() if k not in keys}
+
 
 def seed_data(db: Session, user_id):
-    # Projects
-    p1 = Project(user_id=str(user_id), name="Website Redesign", description="Complete overhaul of company website with modern UI/UX.", status="active", priority="high", start_date=datetime(2026,1,15).date(), due_date=datetime(2026,3,30).date(), budget=45000.00)
-    p2 = Project(user_id=str(user_id), name="Mobile App v2", description="Second major release of the mobile application.", status="active", priority="critical", start_date=datetime(2026,2,1).date(), due_date=datetime(2026,5,15).date(), budget=120000.00)
-    p3 = Project(user_id=str(user_id), name="Data Migration", description="Migrate legacy database to new cloud infrastructure.", status="planning", priority="medium", start_date=datetime(2026,3,1).date(), due_date=datetime(2026,4,15).date(), budget=30000.00)
-    p4 = Project(user_id=str(user_id), name="API Integration Hub", description="Build centralized API gateway for third-party integrations.", status="on_hold", priority="medium", start_date=datetime(2026,1,10).date(), due_date=datetime(2026,6,1).date(), budget=65000.00)
-    p5 = Project(user_id=str(user_id), name="Q1 Marketing Campaign", description="Digital marketing campaign for Q1 product launch.", status="completed", priority="high", start_date=datetime(2026,1,1).date(), due_date=datetime(2026,2,14).date(), budget=25000.00)
-    
-    db.add_all([p1, p2, p3, p4, p5])
-    db.commit()
-    db.refresh(p1)
-    db.refresh(p2)
-    db.refresh(p3)
-    db.refresh(p4)
-    db.refresh(p5)
-    
-    # Tasks
-    tasks = [
-        Task(project_id=p1.id, title="Design wireframes", description="Create wireframes for all major pages.", status="done", priority="high", assigned_to="Design Team", due_date=datetime(2026,2,1).date(), estimated_hours=40, actual_hours=35),
-        Task(project_id=p1.id, title="Implement responsive layout", description="Build mobile-first responsive CSS framework.", status="in_progress", priority="high", assigned_to="Frontend Team", due_date=datetime(2026,2,28).date(), estimated_hours=60, actual_hours=25),
-        Task(project_id=p1.id, title="Backend API endpoints", description="Build REST API for new site features.", status="in_progress", priority="medium", assigned_to="Backend Team", due_date=datetime(2026,3,10).date(), estimated_hours=80, actual_hours=30),
-        Task(project_id=p1.id, title="Content migration", description="Migrate existing content to new CMS.", status="todo", priority="medium", assigned_to="Content Team", due_date=datetime(2026,3,15).date(), estimated_hours=20, actual_hours=0),
-        Task(project_id=p1.id, title="QA testing", description="Full regression testing before launch.", status="todo", priority="high", assigned_to="QA Team", due_date=datetime(2026,3,25).date(), estimated_hours=30, actual_hours=0),
-        Task(project_id=p2.id, title="User authentication revamp", description="Implement biometric login and SSO.", status="in_progress", priority="critical", assigned_to="Mobile Team", due_date=datetime(2026,3,1).date(), estimated_hours=50, actual_hours=20),
-        Task(project_id=p2.id, title="Offline mode", description="Enable app functionality without internet connection.", status="todo", priority="high", assigned_to="Mobile Team", due_date=datetime(2026,4,1).date(), estimated_hours=100, actual_hours=0),
-        Task(project_id=p2.id, title="Push notification system", description="Real-time push notifications for updates.", status="review", priority="medium", assigned_to="Backend Team", due_date=datetime(2026,2,20).date(), estimated_hours=30, actual_hours=28),
-        Task(project_id=p2.id, title="Performance optimization", description="Reduce app load time by 50%.", status="blocked", priority="high", assigned_to="Mobile Team", due_date=datetime(2026,4,15).date(), estimated_hours=40, actual_hours=5),
-        Task(project_id=p3.id, title="Schema mapping", description="Map legacy database schema to new cloud models.", status="todo", priority="high", assigned_to="Data Team", due_date=datetime(2026,3,10).date(), estimated_hours=25, actual_hours=0),
-        Task(project_id=p5.id, title="Social media content calendar", description="Plan and schedule all social posts.", status="done", priority="high", assigned_to="Marketing Team", due_date=datetime(2026,1,15).date(), estimated_hours=15, actual_hours=12),
-        Task(project_id=p5.id, title="Email campaign sequence", description="Design 5-email drip campaign.", status="done", priority="medium", assigned_to="Marketing Team", due_date=datetime(2026,2,1).date(), estimated_hours=10, actual_hours=8)
-    ]
-    db.add_all(tasks)
+    # The sample workspace in one transaction: a handful of batched INSERTs, no per-row refreshes
+    user_id = str(user_id)
+    if db.scalar(select(Project.id).where(Project.user_id == user_id).limit(1)) is not None:
+        return
+
+    project_ids = _insert_returning_ids(db, Project, [dict(p, user_id=user_id) for p in SEED_PROJECTS], key=("name",))
+    task_ids = _insert_returning_ids(db, Task, [
+        dict(_without(t, "project"), project_id=project_ids[t["project"]]) for t in SEED_TASKS
+    ], key=("project_id", "title"))
+    db.execute(insert(Milestone), [dict(_without(m, "project"), project_id=project_ids[m["project"]]) for m in SEED_MILESTONES])
+    db.execute(insert(TimeEntry), [
+        dict(_without(e, "task"), task_id=task_ids[e["task"]], user_id=user_id) for e in SEED_TIME_ENTRIES
+    ])
+    db.execute(insert(ProjectInsight), [dict(_without(i, "project"), project_id=project_ids[i["project"]]) for i in SEED_INSIGHTS])
+    rollups.refresh_sync(db, project_ids)
     db.commit()
-    
-    for t in tasks:
-        db.refresh(t)
-
-    # Milestones
-    milestones = [
-        Milestone(project_id=p1.id, title="Design Approval", description="Client signs off on final designs.", due_date=datetime(2026,2,10).date(), completed=True, completed_at=datetime(2026,2,8)),
-        Milestone(project_id=p1.id, title="Beta Launch", description="Internal beta with stakeholders.", due_date=datetime(2026,3,15).date(), completed=False),
-        Milestone(project_id=p1.id, title="Go Live", description="Public launch of redesigned website.", due_date=datetime(2026,3,30).date(), completed=False),
-        Milestone(project_id=p2.id, title="Alpha Release", description="Internal testing build.", due_date=datetime(2026,3,15).date(), completed=False),
-        Milestone(project_id=p2.id, title="Beta Release", description="Limited public beta.", due_date=datetime(2026,4,15).date(), completed=False),
-        Milestone(project_id=p2.id, title="Production Release", description="App store submission.", due_date=datetime(2026,5,15).date(), completed=False),
-        Milestone(project_id=p5.id, title="Campaign Launch", description="All channels go live.", due_date=datetime(2026,1,20).date(), completed=True, completed_at=datetime(2026,1,20)),
-        Milestone(project_id=p5.id, title="Campaign Wrap", description="Final analysis and report.", due_date=datetime(2026,2,14).date(), completed=True, completed_at=datetime(2026,2,14))
-    ]
-    db.add_all(milestones)
-    
-    # Time Entries
-    time_entries = [
-        TimeEntry(task_id=tasks[0].id, user_id=str(user_id), hours=8, description="Initial wireframe concepts for homepage and product pages.", date=datetime(2026,1,20).date()),
-        TimeEntry(task_id=tasks[0].id, user_id=str(user_id), hours=6, description="Revised wireframes based on stakeholder feedback.", date=datetime(2026,1,22).date()),
-        TimeEntry(task_id=tasks[1].id, user_id=str(user_id), hours=10, description="Set up CSS grid system and breakpoints.", date=datetime(2026,2,5).date()),
-        TimeEntry(task_id=tasks[1].id, user_id=str(user_id), hours=8, description="Mobile navigation and header components.", date=datetime(2026,2,7).date()),
-        TimeEntry(task_id=tasks[2].id, user_id=str(user_id), hours=12, description="User and product API endpoints.", date=datetime(2026,2,10).date()),
-        TimeEntry(task_id=tasks[5].id, user_id=str(user_id), hours=8, description="Research biometric auth SDKs.", date=datetime(2026,2,8).date()),
-        TimeEntry(task_id=tasks[5].id, user_id=str(user_id), hours=12, description="Implement fingerprint and face ID login.", date=datetime(2026,2,12).date()),
-        TimeEntry(task_id=tasks[7].id, user_id=str(user_id), hours=15, description="Firebase push notification integration.", date=datetime(2026,2,14).date()),
-        TimeEntry(task_id=tasks[10].id, user_id=str(user_id), hours=6, description="Planned 4 weeks of social content.", date=datetime(2026,1,10).date()),
-        TimeEntry(task_id=tasks[11].id, user_id=str(user_id), hours=4, description="Wrote email copy for all 5 sequences.", date=datetime(2026,1,25).date())
-    ]
-    db.add_all(time_entries)
-    
-    # Insights
-    insights = [
-        ProjectInsight(project_id=p1.id, insight_type="risk_assessment", content="RISKS: Content migration depends on legacy CMS access which has intermittent outages. Backend API is 20% behind schedule. MITIGATIONS: Start content export early. Add one more developer to API team for 2 weeks. Overall project health: AMBER — on track if mitigations are applied this week.", model_used="seed_data", requested_by="system"),
-        ProjectInsight(project_id=p2.id, insight_type="progress_summary", content="Mobile App v2 is 35% complete. Authentication revamp is ahead of schedule. Push notifications in review. BLOCKER: Performance optimization blocked pending new profiling tools. 3 of 4 tasks on track. Budget utilization at 28% ($33,600 of $120,000). Recommend unblocking performance task as priority.", model_used="seed_data", requested_by="system")
-    ]
-    db.add_all(insights)
-    
+
+
+# First-login seeding runs in the background so the first dashboard request
+# doesn't wait for it; users already being seeded by this worker are skipped.
+_seeding = set()
+
+
+async def seed_in_background(user_id) -> bool:
+    # Returns False if seeding for this user is already running
+    from app.database import AsyncSessionLocal
+    from app import cache
+
+    user_id = str(user_id)
+    if user_id in _seeding:
+        return False
+    _seeding.add(user_id)
+
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.run_sync(seed_data, user_id)
+            await cache.invalidate_tenant(user_id)
+        except Exception:
+            logger.exception("seeding failed for user %s", user_id)
+        finally:
+            _seeding.discard(user_id)
+
+    # A fresh context: a copy of the request's would record the seeding SQL
+    # under its route in app/metrics.py instead of route="background"
+    asyncio.get_running_loop().create_task(run(), context=contextvars.Context())
+    return True
+
+
+def generate_tenant(db: Session, user_id, projects: int, tasks_per_project: int, entries_per_task: int = 1,
+                    milestones_per_project: int = 5, seed: int = 7, today: date = None) -> dict:
+    # Perf-test tenant built from the seed shapes above, cycled and spread
+    # around `today` so overdue / upcoming / this-week queries have work to do.
+    # Inserts in GENERATOR_CHUNK_SIZE batches; commits once at the end.
+    user_id = str(user_id)
+    rng = random.Random(seed)
+    today = today or date.today()
+    base = date(2026, 1, 1)
+
+    def shifted(day: date, jitter: int) -> date:
+        return today + (day - base) - timedelta(days=45) + timedelta(days=rng.randint(-jitter, jitter))
+
+    counts = {"projects": 0, "tasks": 0, "time_entries": 0, "milestones": 0}
+    project_ids = _insert_returning_ids(db, Project, [
+        dict(shape, user_id=user_id, name=f"{shape['name']} #{p + 1}",
+             start_date=shifted(shape["start_date"], 30), due_date=shifted(shape["due_date"], 60))
+        for p, shape in ((p, SEED_PROJECTS[p % len(SEED_PROJECTS)]) for p in range(projects))
+    ], key=("name",))
+    counts["projects"] = len(project_ids)
+
+    for p, project_id in enumerate(project_ids):
+        milestones = [
+            dict(_without(shape, "project"), project_id=project_id, title=f"{shape['title']} #{m + 1}",
+                 due_date=shifted(shape["due_date"], 45))
+            for m, shape in ((m, SEED_MILESTONES[(p + m) % len(SEED_MILESTONES)]) for m in range(milestones_per_project))
+        ]
+        if milestones:
+            db.execute(insert(Milestone), milestones)
+            counts["milestones"] += len(milestones)
+        insight = SEED_INSIGHTS[p % len(SEED_INSIGHTS)]
+        db.execute(insert(ProjectInsight), [dict(_without(insight, "project"), project_id=project_id)])
+
+        for start in range(0, tasks_per_project, GENERATOR_CHUNK_SIZE):
+            chunk = range(start, min(start + GENERATOR_CHUNK_SIZE, tasks_per_project))
+            task_ids = _insert_returning_ids(db, Task, [
+                dict(_without(shape, "project"), project_id=project_id, title=f"{shape['title']} #{t + 1}",
+                     due_date=shifted(shape["due_date"], 30))
+                for t, shape in ((t, SEED_TASKS[(p + t) % len(SEED_TASKS)]) for t in chunk)
+            ], key=("title",))
+            counts["tasks"] += len(task_ids)
+
+            entries = []
+            for i, task_id in enumerate(task_ids):
+                for e in range(entries_per_task):
+                    shape = SEED_TIME_ENTRIES[(i + e) % len(SEED_TIME_ENTRIES)]
+                    entries.append(dict(_without(shape, "task"), task_id=task_id, user_id=user_id,
+                                        date=today - timedelta(days=rng.randint(0, 60))))
+                if len(entries) >= GENERATOR_CHUNK_SIZE:
+                    db.execute(insert(TimeEntry), entries)
+                    counts["time_entries"] += len(entries)
+                    entries = []
+            if entries:
+                db.execute(insert(TimeEntry), entries)
+                counts["time_entries"] += len(entries)
+
+    for start in range(0, len(project_ids), rollups.REBUILD_BATCH_SIZE):
+        rollups.refresh_sync(db, project_ids[start:start + rollups.REBUILD_BATCH_SIZE], today)
     db.commit()
+    return counts
+
+
+if __name__ == "__main__":
+    # python -m app.seed --user perf-1 --projects 100 --tasks-per-project 1000 --entries-per-task 2
+    parser = argparse.ArgumentParser(description="Generate a synthetic tenant for performance testing")
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--projects", type=int, default=10)
+    parser.add_argument("--tasks-per-project", type=int, default=100)
+    parser.add_argument("--entries-per-task", type=int, default=1)
+    parser.add_argument("--milestones-per-project", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Expects a migrated database (python -m app.migrate)
+    from app.database import SessionLocal
+    with SessionLocal() as session:
+        result = generate_tenant(session, args.user, args.projects, args.tasks_per_project,
+                                 args.entries_per_task, args.milestones_per_project, args.seed)
+    logger.info("generated %s", result)
@@ -0,0 +1,36 @@
+// Live updates (see app/events.py): pages that can patch themselves register
+// a handler per delta; the /events stream is opened on the first one. Deltas
+// missed while disconnected can't be replayed, so a reconnect reloads; the
+// server's planned "reconnect" is bridged by opening the next stream first.
+const liveHandlers = [];
+const liveSeen = new Set();
+
+function openLiveStream() {
+    const source = new EventSource('/events');
+    let handedOver = false, dropped = false;
+    source.onerror = () => {
+        if (handedOver) source.close();
+        else dropped = true;
+    };
+    source.onopen = () => { if (dropped) window.location.reload(); };
+    source.addEventListener('reconnect', () => {
+        handedOver = true;
+        openLiveStream().addEventListener('open', () => source.close());
+    });
+    source.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (liveSeen.has(message.id)) return;  // delivered twice during a handover
+        liveSeen.add(message.id);
+        if (liveSeen.size > 500) liveSeen.delete(liveSeen.values().next().value);
+        for (const delta of message.deltas) {
+            if (delta.type === 'resync') return window.location.reload();
+            liveHandlers.forEach(h => h(delta));
+        }
+    };
+    return source;
+}
+
+function onLiveUpdate(handler) {
+    if (!liveHandlers.length) openLiveStream();
+    liveHandlers.push(handler);
+}
@@ -0,0 +1,77 @@
+import os
+import tempfile
+from collections import OrderedDict
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+from app import assets, metrics
+
+# The one Jinja environment every router renders with (app.templating.templates).
+#
+# - Compiled templates are kept in a FileSystemBytecodeCache under
+#   TEMPLATE_CACHE_DIR, so a restarted worker loads bytecode instead of
+#   re-parsing the templates.
+# - auto_reload (stat() every template on every render) is off unless
+#   TEMPLATE_AUTO_RELOAD=1, which is meant for local template editing.
+# - {% fragment "name", key... %}...{% endfragment %} caches the rendered body
+#   of heavily repeated pieces (kanban cards, task rows, timeline items) in
+#   this worker, whose entries every tenant's pages share. The key therefore
+#   starts with the scoping project_id and lists every value the body shows,
+#   rather than an updated_at: deleted rows' ids are reused, and a row that
+#   was never updated has a server-side timestamp with whole-second resolution.
+# - asset_url("style.css") links a fingerprinted static file (app/assets.py).
+TEMPLATE_DIR = "app/templates"
+TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "viva-jinja-cache"))
+TEMPLATE_AUTO_RELOAD = os.environ.get("TEMPLATE_AUTO_RELOAD", "0") == "1"
+FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get("FRAGMENT_CACHE_MAX_ENTRIES", "20000"))
+
+_fragments = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"fragment"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endfragment",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_render", [nodes.Tuple(key, "load")]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        html = _fragments.get(key)
+        if html is not None:
+            _fragments.move_to_end(key)
+            _stats["hits"] += 1
+            return html
+        _stats["misses"] += 1
+        html = _fragments[key] = caller()
+        if len(_fragments) > FRAGMENT_CACHE_MAX_ENTRIES:
+            _fragments.popitem(last=False)
+        return html
+
+
+def _bytecode_cache():
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    except OSError:
+        return None  # read-only filesystem: compile in memory only
+    return FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+
+
+templates = metrics.TimedTemplates(
+    directory=TEMPLATE_DIR,
+    auto_reload=TEMPLATE_AUTO_RELOAD,
+    bytecode_cache=_bytecode_cache(),
+    extensions=[FragmentCacheExtension],
+)
+templates.env.globals["asset_url"] = assets.asset_url
+
+
+def stats() -> dict:
+    return dict(_stats, entries=len(_fragments))
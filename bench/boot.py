@@ -0,0 +1,103 @@
+# Cold-start budget: how long a fresh worker takes to import app.main and run
+# its startup hooks, and which imports dominate.
+#
+#   python bench/boot.py [--budget-ms 1500] [--runs 5] [--top 12]
+#
+# Every run is a fresh interpreter (python -X importtime), against a migrated
+# throwaway SQLite database. Uses the viv-auth / viv-pay stand-ins from
+# bench/standins when the real packages are not installed. Exits 1 when the
+# median import + startup time exceeds the budget (BOOT_BUDGET_MS, as logged
+# by the app's own boot report).
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+
+CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+async def boot():
+    await app.main.app.router.startup()
+    ready = time.perf_counter()
+    await app.main.app.router.shutdown()
+    return ready
+ready = asyncio.run(boot())
+print(json.dumps({"import_ms": (imported - started) * 1000, "startup_ms": (ready - imported) * 1000}))
+"""
+
+
+def child_env(database_url: str) -> dict:
+    paths = [ROOT]
+    if importlib.util.find_spec("viv_auth") is None:
+        paths.insert(0, os.path.join(BENCH_DIR, "standins"))
+    return dict(os.environ, DATABASE_URL=database_url, REQUEST_LOG="0",
+                PYTHONPATH=os.pathsep.join(paths + [os.environ.get("PYTHONPATH", "")]))
+
+
+def parse_importtime(stderr: str) -> dict:
+    # Cumulative microseconds per top-level package, from the -X importtime lines
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        root = name.strip().split(".")[0]
+        # The outermost import of a package carries its full cumulative cost
+        packages[root] = max(packages.get(root, 0), int(cumulative))
+    return packages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("BOOT_BUDGET_MS", "1500")))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL", "sqlite:////tmp/bench_boot.db")
+    env = child_env(database_url)
+    migrated = subprocess.run([sys.executable, "-m", "app.migrate"], env=env, cwd=ROOT, capture_output=True, text=True)
+    if migrated.returncode != 0:
+        print(migrated.stderr)
+        sys.exit(1)
+
+    runs, packages = [], {}
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD], env=env, cwd=ROOT, capture_output=True, text=True)
+        if out.returncode != 0:
+            print(out.stderr[-3000:])
+            sys.exit(1)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        for name, us in parse_importtime(out.stderr).items():
+            packages.setdefault(name, []).append(us)
+
+    import_ms = statistics.median(r["import_ms"] for r in runs)
+    startup_ms = statistics.median(r["startup_ms"] for r in runs)
+    total_ms = import_ms + startup_ms
+
+    print(f"{'package':<28}{'cumulative ms':>14}")
+    ranked = sorted(packages.items(), key=lambda item: -statistics.median(item[1]))
+    for name, values in ranked[:args.top]:
+        print(f"{name:<28}{statistics.median(values) / 1000:>14.1f}")
+    print(f"\nimport {import_ms:.0f}ms, startup {startup_ms:.0f}ms, total {total_ms:.0f}ms "
+          f"(median of {args.runs}, budget {args.budget_ms:.0f}ms)")
+    if "google" in packages:
+        print("note: google.* was imported at boot; app/gemini.py loads the SDK lazily")
+    if total_ms > args.budget_ms:
+        print("OVER BUDGET")
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
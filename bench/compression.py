@@ -0,0 +1,121 @@
+# Bytes on the wire and time to last byte for the large-board pages, with and
+# without compression. Drives the real ASGI app in-process like
+# bench/routes.py (same stand-ins and seeded tenants):
+#
+#   python bench/compression.py
+#   python bench/compression.py --tenants 100k --mbps 10 --rtt-ms 80
+#
+# For each route and Accept-Encoding (identity, gzip, br) it reports the body
+# size on the wire, the server's time to last byte (rendering + compression,
+# no network) and an estimate for a client on a --mbps / --rtt-ms link: one
+# round trip for the request, the transfer time, and one more round trip per
+# TCP slow-start window (10 segments, doubling) the body needs beyond the first.
+# The decoded bodies are checked against the identity response.
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault("REQUEST_LOG", "0")
+sys.path.insert(0, os.path.join(BENCH_DIR, "standins"))
+sys.path.insert(0, BENCH_DIR)
+os.chdir(os.path.dirname(BENCH_DIR))  # app/static and app/templates are cwd-relative
+import harness  # noqa: E402  (sets DATABASE_URL before the app is imported)
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app import assets, cache, compression  # noqa: E402
+
+TENANTS = {
+    "10k": (40, 250),        # projects, tasks per project
+    "100k": (100, 1000),
+}
+ENCODINGS = ("identity",) + compression.ENCODINGS
+SEGMENT_BYTES = 1460
+INITIAL_WINDOW = 10
+
+
+def routes(ids: dict) -> dict:
+    return {
+        "tasks_board": "/tasks",
+        "project_detail": f"/projects/{ids['project_id']}",
+        "api_tasks": "/api/tasks?limit=200",
+        "api_time_entries": "/api/time-entries?limit=200",
+        "style.css": assets.asset_url("style.css"),
+    }
+
+
+def network_ms(size: int, mbps: float, rtt_ms: float) -> float:
+    segments = max(1, math.ceil(size / SEGMENT_BYTES))
+    windows = max(1, math.ceil(math.log2(segments / INITIAL_WINDOW + 1)))
+    return rtt_ms * (windows - 1) + size * 8 / (mbps * 1000)
+
+
+async def measure(client, tenant: str, path: str, encoding: str, iterations: int) -> dict:
+    headers = {"x-bench-user": tenant, "accept-encoding": encoding}
+    timings = []
+    for _ in range(iterations + 1):  # the first request warms up
+        await cache.invalidate_tenant(tenant)
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise SystemExit(f"GET {path} ({tenant}, {encoding}) returned {response.status_code}")
+    return {
+        "bytes": response.num_bytes_downloaded,
+        "encoding": response.headers.get("content-encoding", "identity"),
+        "server_ms": round(statistics.median(timings[1:]), 2),
+        "body": response.content,
+    }
+
+
+async def run_suite(tenants: list, iterations: int) -> dict:
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for tenant in tenants:
+            for name, path in routes(harness.first_ids(tenant)).items():
+                by_encoding = {}
+                for encoding in ENCODINGS:
+                    by_encoding[encoding] = await measure(client, tenant, path, encoding, iterations)
+                identity = by_encoding["identity"]["body"]
+                for encoding, r in by_encoding.items():
+                    if r.pop("body") != identity:
+                        raise SystemExit(f"{tenant}/{name}: {encoding} body differs from identity")
+                results[(tenant, name)] = by_encoding
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenants", default=",".join(TENANTS), help="comma separated subset of " + ", ".join(TENANTS))
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--mbps", type=float, default=20.0, help="client bandwidth for the estimate")
+    parser.add_argument("--rtt-ms", type=float, default=50.0, help="client round trip for the estimate")
+    args = parser.parse_args()
+    tenants = args.tenants.split(",")
+
+    harness.reset_database()
+    for tenant in tenants:
+        harness.seed_large_tenant(tenant, *TENANTS[tenant])
+
+    results = harness.run(run_suite(tenants, args.iterations))
+
+    print(f"link: {args.mbps:g} Mbit/s, {args.rtt_ms:g} ms RTT")
+    print(f"{'tenant':<7}{'route':<18}{'encoding':<10}{'bytes':>10}{'ratio':>7}{'server ms':>11}{'est. TTLB ms':>14}")
+    for (tenant, name), by_encoding in results.items():
+        identity = by_encoding["identity"]["bytes"]
+        for encoding, r in by_encoding.items():
+            if r["encoding"] != encoding:
+                encoding = f"{encoding}*"  # not compressed (below the threshold, or no variant)
+            estimate = r["server_ms"] + args.rtt_ms + network_ms(r["bytes"], args.mbps, args.rtt_ms)
+            print(f"{tenant:<7}{name:<18}{encoding:<10}{r['bytes']:>10}{r['bytes'] / identity:>7.2f}"
+                  f"{r['server_ms']:>11}{estimate:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# Throughput of the engine profiles in app/database.py under a mixed
+# read / write load: concurrent time logging (insert + atomic increment +
+# summary refresh, one transaction each) alongside dashboard reads.
+#
+#   python bench/engine_profiles.py [--seconds 10] [--writers 8] [--readers 8]
+#
+# Each profile runs in a fresh subprocess because engines are configured at
+# import time. Set DATABASE_URL to a Postgres URL to measure the postgres profile.
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def run_profile(profile: str, seconds: float, writers: int, readers: int) -> dict:
+    import harness
+    from datetime import date
+    from sqlalchemy import select, insert
+    from app.database import AsyncSessionLocal
+    from app.models import Task, TimeEntry, Project
+    from app.routes.tasks import add_actual_hours
+    from app import aggregates, rollups
+
+    harness.reset_database()
+    harness.seed_large_tenant("bench", 20, 200)
+    with harness.SessionLocal() as db:
+        task_ids = db.scalars(select(Task.id).join(Project).where(Project.user_id == "bench")).all()
+        project_of = dict(db.execute(select(Task.id, Task.project_id)).all())
+
+    stats = {"writes": 0, "reads": 0, "errors": 0, "write_ms": [], "read_ms": []}
+    deadline = time.perf_counter() + seconds
+
+    async def writer(n: int):
+        i = n
+        while time.perf_counter() < deadline:
+            task_id = task_ids[i % len(task_ids)]
+            i += writers
+            started = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(insert(TimeEntry), [{"task_id": task_id, "user_id": "bench", "hours": 0.25, "date": date.today()}])
+                    await add_actual_hours(db, {task_id: 0.25})
+                    await rollups.refresh(db, [project_of[task_id]])
+                    await db.commit()
+                stats["writes"] += 1
+                stats["write_ms"].append((time.perf_counter() - started) * 1000)
+            except Exception:
+                stats["errors"] += 1
+
+    async def reader():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await aggregates.dashboard_counts(db, "bench", date.today())
+                    await aggregates.recent_activity(db, "bench")
+                stats["reads"] += 1
+                stats["read_ms"].append((time.perf_counter() - started) * 1000)
+            except Exception:
+                stats["errors"] += 1
+
+    async def main():
+        await asyncio.gather(*[writer(n) for n in range(writers)], *[reader() for _ in range(readers)])
+
+    harness.run(main())
+
+    def p95(values):
+        return round(sorted(values)[int(len(values) * 0.95)], 1) if values else None
+
+    return {
+        "profile": profile,
+        "writes_per_s": round(stats["writes"] / seconds, 1),
+        "reads_per_s": round(stats["reads"] / seconds, 1),
+        "write_p95_ms": p95(stats["write_ms"]),
+        "read_p95_ms": p95(stats["read_ms"]),
+        "errors": stats["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--profiles", default=None, help="comma separated, default: library + the URL's backend")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_profile(args.child, args.seconds, args.writers, args.readers)
+        print(json.dumps(result))
+        return
+
+    url = os.environ.get("DATABASE_URL", "sqlite:////tmp/bench_app.db")
+    backend_profile = "sqlite" if url.startswith("sqlite") else "postgres"
+    profiles = args.profiles.split(",") if args.profiles else ["library", backend_profile]
+
+    print(f"{'profile':<10}{'writes/s':>10}{'reads/s':>10}{'write p95':>12}{'read p95':>11}{'errors':>8}")
+    for profile in profiles:
+        env = dict(os.environ, DB_PROFILE=profile, DATABASE_URL=url)
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", profile, "--seconds", str(args.seconds),
+             "--writers", str(args.writers), "--readers", str(args.readers)],
+            env=env, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        if out.returncode != 0:
+            print(out.stderr)
+            sys.exit(1)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        write_p95 = f"{r['write_p95_ms']}ms" if r["write_p95_ms"] is not None else "-"
+        read_p95 = f"{r['read_p95_ms']}ms" if r["read_p95_ms"] is not None else "-"
+        print(f"{r['profile']:<10}{r['writes_per_s']:>10}{r['reads_per_s']:>10}{write_p95:>12}{read_p95:>11}{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Streaming export benchmark: time to first byte, throughput and peak memory
+# of /api/time-entries/export and /api/tasks/export on a tenant with millions
+# of time entries. Calls the real ASGI app in-process (stand-ins from
+# bench/standins) with a send() that only counts bytes, so nothing but the
+# server side is measured.
+#
+#   python bench/exports.py                          # 100 x 1000 tasks, 10 entries each (1M rows)
+#   python bench/exports.py --entries-per-task 30    # 3M rows
+#
+# Peak memory is measured in a second, traced pass (tracemalloc slows the
+# export down). It should not grow with the number of rows exported: compare
+# the one-week export with the full ones.
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault("REQUEST_LOG", "0")
+sys.path.insert(0, os.path.join(BENCH_DIR, "standins"))
+sys.path.insert(0, BENCH_DIR)
+os.chdir(os.path.dirname(BENCH_DIR))  # app/static and app/templates are cwd-relative
+import harness  # noqa: E402  (sets DATABASE_URL before the app is imported)
+
+from app.main import app  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.seed import generate_tenant  # noqa: E402
+
+TENANT = "export"
+
+
+def exports() -> dict:
+    week_ago = (date.today() - timedelta(days=7)).isoformat()
+    return {
+        "time entries csv": ("/api/time-entries/export", "format=csv", "identity"),
+        "time entries ndjson": ("/api/time-entries/export", "format=ndjson", "identity"),
+        "time entries csv br": ("/api/time-entries/export", "format=csv", "br"),
+        "last week csv": ("/api/time-entries/export", f"format=csv&date_from={week_ago}", "identity"),
+        "tasks csv": ("/api/tasks/export", "format=csv", "identity"),
+    }
+
+
+async def call(path: str, query: str, encoding: str) -> dict:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "client": ("127.0.0.1", 1), "server": ("bench", 80),
+        "headers": [(b"host", b"bench"), (b"x-bench-user", TENANT.encode()), (b"accept-encoding", encoding.encode())],
+    }
+    disconnected = asyncio.Event()
+    requested = False
+    result = {"status": None, "bytes": 0, "chunks": 0, "ttfb_ms": None}
+    started = time.perf_counter()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            if result["ttfb_ms"] is None:
+                result["ttfb_ms"] = (time.perf_counter() - started) * 1000
+            result["bytes"] += len(message["body"])
+            result["chunks"] += 1
+
+    await app(scope, receive, send)
+    disconnected.set()
+    result["total_s"] = time.perf_counter() - started
+    if result["status"] != 200:
+        raise SystemExit(f"GET {path}?{query} returned {result['status']}")
+    return result
+
+
+async def run_suite(memory: bool) -> dict:
+    results = {}
+    for name, (path, query, encoding) in exports().items():
+        r = await call(path, query, encoding)
+        if memory:
+            tracemalloc.start()
+            await call(path, query, encoding)
+            r["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+        results[name] = r
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--tasks-per-project", type=int, default=1000)
+    parser.add_argument("--entries-per-task", type=int, default=10)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced pass")
+    args = parser.parse_args()
+
+    total = args.projects * args.tasks_per_project * args.entries_per_task
+    print(f"seeding {total} time entries ...")
+    started = time.perf_counter()
+    harness.reset_database()
+    with SessionLocal() as db:
+        generate_tenant(db, TENANT, args.projects, args.tasks_per_project, entries_per_task=args.entries_per_task)
+    print(f"seeded in {time.perf_counter() - started:.0f}s\n")
+
+    results = harness.run(run_suite(not args.no_memory))
+
+    print(f"{'export':<22}{'MB':>9}{'chunks':>8}{'TTFB ms':>9}{'total s':>9}{'MB/s':>7}{'peak KiB':>10}")
+    for name, r in results.items():
+        mb = r["bytes"] / 1e6
+        peak = f"{r['peak_kb']:.0f}" if "peak_kb" in r else "-"
+        print(f"{name:<22}{mb:>9.1f}{r['chunks']:>8}{r['ttfb_ms']:>9.1f}{r['total_s']:>9.2f}{mb / r['total_s']:>7.1f}{peak:>10}")
+
+
+if __name__ == "__main__":
+    main()
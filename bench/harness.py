@@ -0,0 +1,122 @@
+# Shared helpers for the scripts in bench/: a throwaway SQLite database,
+# synthetic tenants, and direct calls into the route handlers with a plain
+# user object (no viv-auth / viv-pay needed).
+import asyncio
+import os
+import sys
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# The baseline migration imports app.main; fall back to the offline viv-auth /
+# viv-pay stand-ins when the real packages are not installed
+sys.path.append(os.path.join(os.path.dirname(__file__), "standins"))
+os.environ.setdefault("DATABASE_URL", "sqlite:////tmp/bench_app.db")
+
+from sqlalchemy import MetaData, event, select, func
+from starlette.requests import Request
+
+from app.database import engine, async_engine, AsyncSessionLocal, SessionLocal, DATABASE_URL
+from app.models import Project, Task, ProjectInsight
+from app import migrate
+from app.seed import seed_data, generate_tenant
+
+
+def reset_database():
+    # Drops everything: point DATABASE_URL at a throwaway database
+    if DATABASE_URL.startswith("sqlite:///"):
+        path = DATABASE_URL[len("sqlite:///"):]
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    else:
+        existing = MetaData()
+        existing.reflect(bind=engine)
+        existing.drop_all(bind=engine)
+    engine.dispose()
+    migrate.upgrade(engine)
+
+
+def make_user(user_id: str):
+    return SimpleNamespace(id=user_id, email=f"{user_id}@bench.local")
+
+
+def seed_small_tenant(user_id: str):
+    with SessionLocal() as db:
+        seed_data(db, user_id)
+
+
+def seed_large_tenant(user_id: str, projects: int, tasks_per_project: int, seed: int = 7):
+    # Same shapes as a new user's sample data, scaled up (see app.seed.generate_tenant)
+    with SessionLocal() as db:
+        generate_tenant(db, user_id, projects, tasks_per_project, entries_per_task=1, seed=seed)
+
+
+def first_ids(user_id: str) -> dict:
+    with SessionLocal() as db:
+        project_id = db.scalar(select(func.min(Project.id)).where(Project.user_id == user_id))
+        task_id = db.scalar(select(func.min(Task.id)).where(Task.project_id == project_id))
+        insight_id = db.scalar(select(func.min(ProjectInsight.id)).where(ProjectInsight.project_id == project_id))
+    return {"project_id": project_id, "task_id": task_id, "insight_id": insight_id}
+
+
+def make_request(path: str, method: str = "GET") -> Request:
+    return Request({
+        "type": "http", "method": method, "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": [], "scheme": "http", "server": ("bench", 80), "client": ("bench", 1),
+    })
+
+
+def pages(ids: dict) -> dict:
+    # Every read page, as (path, async callable taking (db, user))
+    from app.routes import dashboard, projects, tasks, milestones, insights
+
+    def page(path, handler, **kwargs):
+        async def call(db, user):
+            return await handler(make_request(path), db=db, user=user, _=None, **kwargs)
+        return path, call
+
+    return dict([
+        ("dashboard", page("/", dashboard.dashboard)),
+        ("list_projects", page("/projects", projects.list_projects, status_filter=None, sort_by="due_date")),
+        ("project_detail", page(f"/projects/{ids['project_id']}", projects.project_detail, id=ids["project_id"])),
+        ("tasks_board", page("/tasks", tasks.tasks_board)),
+        ("task_detail", page(f"/tasks/{ids['task_id']}", tasks.task_detail, id=ids["task_id"])),
+        ("list_milestones", page("/milestones", milestones.list_milestones)),
+        ("list_insights", page("/insights", insights.list_insights)),
+        ("insight_detail", page(f"/insights/{ids['insight_id']}", insights.insight_detail, id=ids["insight_id"])),
+    ])
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+@contextmanager
+def count_statements():
+    counter = StatementCounter()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", counter._on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", counter._on_execute)
+
+
+def run(coro):
+    # asyncio.run() that also closes the async pool: pooled aiosqlite
+    # connections run on non-daemon threads and would keep the process alive
+    async def main():
+        try:
+            return await coro
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(main())
+
+
+async def call_page(handler, user):
+    async with AsyncSessionLocal() as db:
+        return await handler(db, user)
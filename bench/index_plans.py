@@ -0,0 +1,158 @@
+# Query plans and timings for the route predicates, before and after the
+# hot-path indexes from app/migrate.py.
+#
+#   python bench/index_plans.py                      # SQLite, 1M tasks
+#   python bench/index_plans.py --tasks 100000
+#   python bench/index_plans.py --url postgresql://localhost/bench
+#
+# The database at --url is dropped and rebuilt, never point it at real data.
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--url", default="sqlite:////tmp/bench_index_plans.db")
+parser.add_argument("--tasks", type=int, default=1_000_000)
+parser.add_argument("--tenants", type=int, default=1000)
+parser.add_argument("--projects-per-tenant", type=int, default=10)
+parser.add_argument("--repeat", type=int, default=20)
+args = parser.parse_args()
+
+os.environ["DATABASE_URL"] = args.url
+
+from sqlalchemy import create_engine, insert, text
+from app.database import Base
+from app.models import Project, Task, Milestone, TimeEntry, ProjectInsight
+from app import migrate
+
+engine = create_engine(args.url)
+is_sqlite = engine.dialect.name == "sqlite"
+tables = migrate._model_tables()
+
+STATUSES = ["todo", "in_progress", "review", "done", "blocked"]
+PRIORITIES = ["low", "medium", "high", "critical"]
+TODAY = date.today()
+
+
+def load():
+    if is_sqlite and os.path.exists(engine.url.database):
+        os.remove(engine.url.database)
+    Base.metadata.drop_all(engine, tables=tables)
+    Base.metadata.create_all(engine, tables=tables)
+    with engine.begin() as conn:
+        for table in tables:
+            for index in table.indexes:
+                index.drop(bind=conn)
+
+    rng = random.Random(42)
+    n_projects = args.tenants * args.projects_per_tenant
+    tasks_per_project = max(1, args.tasks // n_projects)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(insert(Project), [
+            {"id": p + 1, "user_id": str(p // args.projects_per_tenant + 1), "name": f"Project {p}",
+             "status": rng.choice(["planning", "active", "on_hold", "completed"]), "priority": rng.choice(PRIORITIES)}
+            for p in range(n_projects)
+        ])
+        conn.execute(insert(Milestone), [
+            {"project_id": p + 1, "title": f"M{m}", "due_date": TODAY + timedelta(days=rng.randint(-60, 60)),
+             "completed": rng.random() < 0.4}
+            for p in range(n_projects) for m in range(5)
+        ])
+        conn.execute(insert(ProjectInsight), [
+            {"project_id": p + 1, "insight_type": "risk_assessment", "content": "x", "generated_at": datetime.now() - timedelta(days=i)}
+            for p in range(n_projects) for i in range(2)
+        ])
+
+    task_id = 0
+    batch = []
+    for p in range(n_projects):
+        for _ in range(tasks_per_project):
+            task_id += 1
+            batch.append({"id": task_id, "project_id": p + 1, "title": f"Task {task_id}",
+                          "status": rng.choice(STATUSES), "priority": rng.choice(PRIORITIES),
+                          "due_date": TODAY + timedelta(days=rng.randint(-90, 90)), "actual_hours": 0.0})
+            if len(batch) == 50_000:
+                with engine.begin() as conn:
+                    conn.execute(insert(Task), batch)
+                batch = []
+    if batch:
+        with engine.begin() as conn:
+            conn.execute(insert(Task), batch)
+
+    # One time entry per task, owned by the project's tenant
+    batch = []
+    for t in range(1, task_id + 1):
+        project_id = (t - 1) // tasks_per_project + 1
+        batch.append({"task_id": t, "user_id": str((project_id - 1) // args.projects_per_tenant + 1), "hours": 1.5,
+                      "date": TODAY - timedelta(days=rng.randint(0, 90)),
+                      "created_at": datetime.now() - timedelta(minutes=rng.randint(0, 200_000))})
+        if len(batch) == 50_000:
+            with engine.begin() as conn:
+                conn.execute(insert(TimeEntry), batch)
+            batch = []
+    if batch:
+        with engine.begin() as conn:
+            conn.execute(insert(TimeEntry), batch)
+    print(f"loaded {task_id} tasks / time entries across {n_projects} projects in {time.perf_counter() - started:.1f}s")
+
+
+def queries(user_id: str):
+    with engine.connect() as conn:
+        project_ids = [r[0] for r in conn.execute(text("SELECT id FROM projects WHERE user_id = :u"), {"u": user_id})]
+    ids = ", ".join(str(i) for i in project_ids)
+    week_start = TODAY - timedelta(days=TODAY.weekday())
+    params = {"u": user_id, "today": TODAY, "next_week": TODAY + timedelta(days=7), "week_start": week_start}
+    return {
+        "projects by user": "SELECT * FROM projects WHERE user_id = :u",
+        "board tasks": f"SELECT * FROM tasks WHERE project_id IN ({ids})",
+        "board column": f"SELECT * FROM tasks WHERE project_id IN ({ids}) AND status = 'review'",
+        "upcoming tasks": f"SELECT * FROM tasks WHERE project_id IN ({ids}) AND due_date >= :today AND due_date <= :next_week AND status != 'done'",
+        "active task count": f"SELECT count(*) FROM tasks WHERE project_id IN ({ids}) AND status IN ('todo', 'in_progress', 'review', 'blocked')",
+        "overdue count": f"SELECT count(*) FROM tasks WHERE project_id IN ({ids}) AND due_date < :today AND status != 'done'",
+        "upcoming milestones": f"SELECT * FROM milestones WHERE project_id IN ({ids}) AND due_date >= :today AND due_date <= :next_week AND completed = false",
+        "milestone list": f"SELECT * FROM milestones WHERE project_id IN ({ids}) ORDER BY due_date",
+        "hours this week": "SELECT sum(hours) FROM time_entries WHERE user_id = :u AND date >= :week_start",
+        "recent activity": "SELECT * FROM time_entries WHERE user_id = :u ORDER BY created_at DESC LIMIT 10",
+        "insight history": f"SELECT * FROM project_insights WHERE project_id IN ({ids}) ORDER BY generated_at DESC",
+    }, params
+
+
+def measure(label: str):
+    results = {}
+    user_id = str(args.tenants // 2)
+    sql_by_name, params = queries(user_id)
+    with engine.connect() as conn:
+        for name, sql in sql_by_name.items():
+            explain = "EXPLAIN QUERY PLAN " if is_sqlite else "EXPLAIN "
+            plan = [" ".join(str(c) for c in row[-1:]) for row in conn.execute(text(explain + sql), params)]
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = (statistics.median(timings), plan)
+
+    print(f"\n== {label}")
+    for name, (ms, plan) in results.items():
+        print(f"{name:<22} {ms:9.2f} ms   {' | '.join(plan)}")
+    return results
+
+
+load()
+before = measure("without indexes")
+with engine.begin() as conn:
+    migrate.hot_path_indexes(conn)
+    if is_sqlite:
+        conn.execute(text("ANALYZE"))
+after = measure("with hot-path indexes")
+
+print("\n== speedup (median)")
+for name in before:
+    print(f"{name:<22} {before[name][0] / max(after[name][0], 0.001):8.1f}x")
@@ -0,0 +1,193 @@
+# Route-level benchmark: drives the real ASGI app (middleware, dependencies,
+# templates) in-process with the offline viv-auth / viv-pay stand-ins in
+# bench/standins, for several tenant sizes.
+#
+#   python bench/routes.py                       # compare against bench/baseline.json
+#   python bench/routes.py --update-baseline     # record a new baseline
+#   DATABASE_URL=postgresql://localhost/viva_bench python bench/routes.py
+#
+# Reports p50 / p95 / p99 latency, SQL statements per request and peak Python
+# memory per request, and exits 1 when a route regresses past the baseline:
+#   - more statements than recorded
+#   - p95 above baseline * (1 + --latency-tolerance) + LATENCY_SLACK_MS
+#   - peak memory above baseline * (1 + --memory-tolerance)
+# Latency baselines are machine specific; record them on the machine that
+# runs the comparison. The per-request page cache is bypassed (every request
+# is a cache miss) so the numbers reflect the queries. Responses are requested
+# uncompressed; bench/compression.py measures compression.
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault("REQUEST_LOG", "0")
+sys.path.insert(0, os.path.join(BENCH_DIR, "standins"))
+sys.path.insert(0, BENCH_DIR)
+os.chdir(os.path.dirname(BENCH_DIR))  # app/static and app/templates are cwd-relative
+import harness  # noqa: E402  (sets DATABASE_URL before the app is imported)
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.database import BACKEND  # noqa: E402
+from app import cache  # noqa: E402
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+LATENCY_SLACK_MS = 2.0
+
+TENANTS = {
+    "seed": None,            # the sample workspace: 5 projects, 12 tasks
+    "10k": (40, 250),        # projects, tasks per project
+    "100k": (100, 1000),
+}
+
+
+def routes(ids: dict) -> dict:
+    # name -> (method, path, request kwargs factory taking the iteration number)
+    task_id = ids["task_id"]
+    return {
+        "dashboard": ("GET", "/", None),
+        "list_projects": ("GET", "/projects", None),
+        "project_detail": ("GET", f"/projects/{ids['project_id']}", None),
+        "tasks_board": ("GET", "/tasks", None),
+        "list_milestones": ("GET", "/milestones", None),
+        "list_insights": ("GET", "/insights", None),
+        "move_task": ("POST", f"/tasks/{task_id}/move",
+                      lambda i: {"json": {"status": "review" if i % 2 else "in_progress"}}),
+        "log_time": ("POST", f"/tasks/{task_id}/log-time",
+                     lambda i: {"data": {"hours": "0.5", "date_logged": "2026-01-15", "description": "bench"}}),
+    }
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+
+async def measure_route(client, tenant: str, method: str, path: str, make_kwargs, iterations: int, warmup: int) -> dict:
+    headers = {"x-bench-user": tenant, "accept-encoding": "identity"}
+
+    async def call(i: int):
+        kwargs = make_kwargs(i) if make_kwargs else {}
+        response = await client.request(method, path, headers=headers, **kwargs)
+        if response.status_code >= 400:
+            raise SystemExit(f"{method} {path} ({tenant}) returned {response.status_code}: {response.text[:300]}")
+
+    for i in range(warmup):
+        await cache.invalidate_tenant(tenant)
+        await call(i)
+
+    latencies = []
+    statements = 0
+    for i in range(iterations):
+        # The invalidation is a write of its own (app/cache.py): neither timed nor counted
+        await cache.invalidate_tenant(tenant)
+        with harness.count_statements() as counter:
+            started = time.perf_counter()
+            await call(warmup + i)
+            latencies.append((time.perf_counter() - started) * 1000)
+        statements += counter.count
+
+    # Separate pass: tracemalloc slows everything down, so it is not timed
+    await cache.invalidate_tenant(tenant)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    await call(warmup + iterations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "statements": round(statements / iterations, 1),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+async def run_suite(tenants: list, iterations: int, warmup: int) -> dict:
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", follow_redirects=False) as client:
+        for tenant in tenants:
+            ids = harness.first_ids(tenant)
+            results[tenant] = {}
+            for name, (method, path, make_kwargs) in routes(ids).items():
+                results[tenant][name] = await measure_route(client, tenant, method, path, make_kwargs, iterations, warmup)
+    return results
+
+
+def compare(results: dict, baseline: dict, latency_tolerance: float, memory_tolerance: float) -> list:
+    failures = []
+    for tenant, by_route in results.items():
+        for name, r in by_route.items():
+            base = baseline.get(tenant, {}).get(name)
+            if not base:
+                continue
+            if r["statements"] > base["statements"]:
+                failures.append(f"{tenant}/{name}: {r['statements']} statements, baseline {base['statements']}")
+            if r["p95_ms"] > base["p95_ms"] * (1 + latency_tolerance) + LATENCY_SLACK_MS:
+                failures.append(f"{tenant}/{name}: p95 {r['p95_ms']}ms, baseline {base['p95_ms']}ms")
+            if r["peak_kb"] > base["peak_kb"] * (1 + memory_tolerance):
+                failures.append(f"{tenant}/{name}: peak {r['peak_kb']}KiB, baseline {base['peak_kb']}KiB")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenants", default=",".join(TENANTS), help="comma separated subset of " + ", ".join(TENANTS))
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--latency-tolerance", type=float, default=0.5)
+    parser.add_argument("--memory-tolerance", type=float, default=0.5)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    tenants = args.tenants.split(",")
+
+    harness.reset_database()
+    for tenant in tenants:
+        size = TENANTS[tenant]
+        if size is None:
+            harness.seed_small_tenant(tenant)
+        else:
+            harness.seed_large_tenant(tenant, *size)
+
+    results = harness.run(run_suite(tenants, args.iterations, args.warmup))
+
+    print(f"backend: {BACKEND}")
+    print(f"{'tenant':<7}{'route':<17}{'p50':>9}{'p95':>9}{'p99':>9}{'stmts':>7}{'peak KiB':>10}")
+    for tenant, by_route in results.items():
+        for name, r in by_route.items():
+            print(f"{tenant:<7}{name:<17}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['statements']:>7}{r['peak_kb']:>10}")
+
+    stored = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            stored = json.load(f)
+
+    if args.update_baseline:
+        stored.setdefault(BACKEND, {}).update(results)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nbaseline written to {BASELINE_PATH}")
+        return
+
+    if BACKEND not in stored:
+        print(f"\nno {BACKEND} baseline recorded; run with --update-baseline")
+        return
+    failures = compare(results, stored[BACKEND], args.latency_tolerance, args.memory_tolerance)
+    if failures:
+        print("\nREGRESSIONS\n" + "\n".join(failures))
+        sys.exit(1)
+    print("\nok")
+
+
+if __name__ == "__main__":
+    main()
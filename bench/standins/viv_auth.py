@@ -0,0 +1,19 @@
+# Offline stand-in for viv-auth used by bench/routes.py: same init_auth()
+# signature, no session cookies. The tenant is taken from the X-Bench-User header.
+from types import SimpleNamespace
+
+from fastapi import Request
+from sqlalchemy import Column, Integer, String
+
+
+def init_auth(app, engine, Base, get_db, app_name=None):
+    class User(Base):
+        __tablename__ = "users"
+        id = Column(Integer, primary_key=True)
+        email = Column(String)
+
+    async def require_auth(request: Request):
+        user_id = request.headers.get("x-bench-user", "bench")
+        return SimpleNamespace(id=user_id, email=f"{user_id}@bench.local")
+
+    return User, require_auth
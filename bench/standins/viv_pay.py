@@ -0,0 +1,15 @@
+# Offline stand-in for viv-pay used by bench/routes.py: every user has an
+# active subscription and checkout never leaves the process.
+
+
+def init_pay(app, engine, Base, get_db, app_name=None):
+    def create_checkout(user_id, email, price_id):
+        return "/pricing"
+
+    def get_customer(user_id):
+        return None
+
+    async def require_subscription(request, user_id=None):
+        return {"user_id": user_id, "status": "active"}
+
+    return create_checkout, get_customer, require_subscription
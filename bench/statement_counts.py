@@ -0,0 +1,73 @@
+# Asserts that every read page issues a fixed number of SQL statements,
+# independent of how many rows the tenant has (no N+1 lazy loads).
+#
+#   python bench/statement_counts.py
+#
+# Exits non-zero if a page exceeds its budget or its count grows with tenant size.
+# Pages are measured on a cache miss; a cached page issues one statement, the
+# tenant's data version (app/cache.py).
+import sys
+
+import harness
+from app import cache
+
+# Maximum statements per page (auth / subscription lookups are not counted).
+# Pages read through cache.cached() include its data-version read.
+BUDGETS = {
+    "dashboard": 5,
+    "list_projects": 2,
+    "project_detail": 4,
+    "tasks_board": 3,
+    "task_detail": 2,
+    "list_milestones": 2,
+    "list_insights": 2,
+    "insight_detail": 1,
+}
+
+TENANTS = {
+    "seed": None,
+    "large": (40, 250),   # projects, tasks per project -> 10k tasks
+}
+
+
+async def measure(user_id: str) -> dict:
+    user = harness.make_user(user_id)
+    counts = {}
+    for name, (path, handler) in harness.pages(harness.first_ids(user_id)).items():
+        await cache.invalidate_tenant(user_id)
+        with harness.count_statements() as counter:
+            response = await harness.call_page(handler, user)
+        if response.status_code != 200:
+            raise SystemExit(f"{name} ({path}) returned {response.status_code}")
+        counts[name] = counter.count
+    return counts
+
+
+def main():
+    harness.reset_database()
+    results = {}
+    for tenant, size in TENANTS.items():
+        if size is None:
+            harness.seed_small_tenant(tenant)
+        else:
+            harness.seed_large_tenant(tenant, *size)
+        results[tenant] = harness.run(measure(tenant))
+
+    failures = []
+    print(f"{'page':<18}" + "".join(f"{t:>8}" for t in TENANTS) + f"{'budget':>8}")
+    for name, budget in BUDGETS.items():
+        counts = [results[t][name] for t in TENANTS]
+        print(f"{name:<18}" + "".join(f"{c:>8}" for c in counts) + f"{budget:>8}")
+        if max(counts) > budget:
+            failures.append(f"{name}: {max(counts)} statements, budget {budget}")
+        if len(set(counts)) > 1:
+            failures.append(f"{name}: statement count grows with tenant size {counts}")
+
+    if failures:
+        print("\nFAILED\n" + "\n".join(failures))
+        sys.exit(1)
+    print("\nok")
+
+
+if __name__ == "__main__":
+    main()